@@ -5,6 +5,10 @@ Sigue estándares FAIR (Findable, Accessible, Interoperable, Reusable)
 import asyncio
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from scipy.stats import shapiro
 from datetime import datetime, timedelta
 import json
 import logging
@@ -12,38 +16,40 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import hashlib
 import zipfile
-from dataclasses import dataclass, asdict
+import shutil
+from dataclasses import dataclass, asdict, field
 import yaml
 
 # Configuración científica
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Valores por defecto compartidos de los metadatos (tuplas congeladas a nivel
+# de módulo: se construyen una sola vez en lugar de en cada instanciación)
+_DEFAULT_CREATORS = (
+    {"name": "HelioBio-Social Research Team", "affiliation": "Open Science Collective"},
+    {"name": "NOAA Space Weather Prediction Center", "role": "data provider"},
+    {"name": "World Health Organization", "role": "data provider"},
+    {"name": "CDC National Center for Health Statistics", "role": "data provider"}
+)
+_DEFAULT_KEYWORDS = (
+    "heliobiology", "solar activity", "mental health",
+    "geomagnetic storms", "epidemiology", "time series analysis",
+    "public health", "space weather", "psychiatry"
+)
+
 @dataclass
 class DatasetMetadata:
     """Metadatos FAIR para el dataset científico"""
     title: str = "HelioBio-Social Scientific Dataset v1.0"
     description: str = "Multi-decadal dataset of solar activity and mental health indicators (2010-2025)"
-    creators: List[Dict] = None
+    creators: List[Dict] = field(default_factory=lambda: list(_DEFAULT_CREATORS))
     publication_date: str = None
     license: str = "CC BY 4.0"
-    keywords: List[str] = None
+    keywords: List[str] = field(default_factory=lambda: list(_DEFAULT_KEYWORDS))
     version: str = "1.0.0"
-    
+
     def __post_init__(self):
-        if self.creators is None:
-            self.creators = [
-                {"name": "HelioBio-Social Research Team", "affiliation": "Open Science Collective"},
-                {"name": "NOAA Space Weather Prediction Center", "role": "data provider"},
-                {"name": "World Health Organization", "role": "data provider"},
-                {"name": "CDC National Center for Health Statistics", "role": "data provider"}
-            ]
-        if self.keywords is None:
-            self.keywords = [
-                "heliobiology", "solar activity", "mental health", 
-                "geomagnetic storms", "epidemiology", "time series analysis",
-                "public health", "space weather", "psychiatry"
-            ]
         if self.publication_date is None:
             self.publication_date = datetime.now().strftime("%Y-%m-%d")
 
@@ -65,15 +71,28 @@ class HistoricalDataPipeline:
         
         # Metadatos del dataset
         self.metadata = DatasetMetadata()
+
+        # Generador PCG64 sembrado y compartido entre colectores: reproducible
+        # y ~2x más rápido que la familia global legacy np.random.*
+        self._rng = np.random.default_rng(42)
+
+        # Merge solar+mental canónico, compartido entre generadores de derivados
+        self._merged: Optional[pd.DataFrame] = None
+
+        # Tabla de tormentas históricas, cargada perezosamente una vez por proceso
+        self._historical_storms: Optional[pd.DataFrame] = None
         
     async def build_complete_dataset(self, start_year: int = 2010, end_year: int = 2025):
         """Construir dataset científico completo"""
         logger.info(f"🚀 Iniciando construcción de dataset científico {start_year}-{end_year}")
         
-        # 1. Recolección de datos
-        solar_data = await self.collect_solar_data(start_year, end_year)
-        mental_health_data = await self.collect_mental_health_data(start_year, end_year)
-        social_data = await self.collect_social_data(start_year, end_year)
+        # 1. Recolección de datos (las tres fuentes son independientes,
+        # se recolectan concurrentemente para solapar la E/S)
+        solar_data, mental_health_data, social_data = await asyncio.gather(
+            self.collect_solar_data(start_year, end_year),
+            self.collect_mental_health_data(start_year, end_year),
+            self.collect_social_data(start_year, end_year)
+        )
         
         # 2. Procesamiento y limpieza
         processed_data = await self.process_and_clean_data(
@@ -83,8 +102,14 @@ class HistoricalDataPipeline:
         # 3. Validación científica
         validation_report = await self.validate_dataset(processed_data)
         
-        # 4. Generación de derivados científicos
-        derived_datasets = await self.generate_scientific_derivatives(processed_data)
+        # 4. Generación de derivados científicos (el merge solar+mental se
+        # materializa una sola vez y se comparte entre los generadores)
+        self._merged = processed_data['solar'].merge(
+            processed_data['mental_health'], on='date', how='inner'
+        )
+        derived_datasets = await self.generate_scientific_derivatives(
+            processed_data, merged=self._merged
+        )
         
         # 5. Documentación y metadatos
         await self.generate_documentation(processed_data, derived_datasets, validation_report)
@@ -113,25 +138,42 @@ class HistoricalDataPipeline:
         solar_cycle = 11 * 365  # días
         time = np.arange(len(dates))
         
-        # Componentes del modelo solar
-        solar_cycle_component = 50 * (1 + np.sin(2 * np.pi * time / solar_cycle))
-        seasonal_component = 10 * np.sin(2 * np.pi * time / 365)
-        noise = np.random.normal(0, 5, len(dates))
-        
+        # Componentes del modelo solar. La fase 2*pi*t se computa una sola vez
+        # y las sumas se hacen in-place para no materializar arrays intermedios
+        # por campo (la generación sintética está limitada por ancho de banda)
+        phase = (2 * np.pi) * time
+        solar_cycle_component = 50 * (1 + np.sin(phase / solar_cycle))
+        seasonal_component = 10 * np.sin(phase / 365)
+
+        # Todo el ruido gaussiano del colector en una sola llamada al generador
+        normals = self._rng.standard_normal((4, len(dates)))
+
+        sunspot_number = solar_cycle_component + seasonal_component
+        sunspot_number += 5 * normals[0]
+        np.maximum(sunspot_number, 0, out=sunspot_number)
+
+        solar_flux = 3 * normals[1]
+        solar_flux += 70
+        solar_flux += 0.5 * solar_cycle_component
+
+        solar_wind = 100 * np.sin(phase / 27)
+        solar_wind += 400
+        solar_wind += 50 * normals[2]
+
         # Generar datos realistas
         data = {
             'date': dates,
-            'sunspot_number': np.maximum(0, solar_cycle_component + seasonal_component + noise),
-            'solar_flux_10cm': 70 + 0.5 * solar_cycle_component + np.random.normal(0, 3, len(dates)),
-            'kp_index': np.random.gamma(2, 1.5, len(dates)),  # Distribución realista de Kp
-            'solar_wind_speed': 400 + 100 * np.sin(2 * np.pi * time / 27) + np.random.normal(0, 50, len(dates)),
-            'bz_component': np.random.normal(0, 5, len(dates)),
-            'proton_density': np.random.lognormal(1.5, 0.5, len(dates)),
+            'sunspot_number': sunspot_number,
+            'solar_flux_10cm': solar_flux,
+            'kp_index': self._rng.gamma(2, 1.5, len(dates)),  # Distribución realista de Kp
+            'solar_wind_speed': solar_wind,
+            'bz_component': 5 * normals[3],
+            'proton_density': self._rng.lognormal(1.5, 0.5, len(dates)),
             # Eventos de tormenta geomagnética (simulados)
-            'geomagnetic_storm': (np.random.random(len(dates)) < 0.05).astype(int),
+            'geomagnetic_storm': (self._rng.random(len(dates)) < 0.05).astype(int),
             'storm_intensity': np.where(
-                np.random.random(len(dates)) < 0.02,
-                np.random.choice([1, 2, 3], len(dates), p=[0.7, 0.25, 0.05]),
+                self._rng.random(len(dates)) < 0.02,
+                self._rng.choice([1, 2, 3], len(dates), p=[0.7, 0.25, 0.05]),
                 0
             )
         }
@@ -141,33 +183,72 @@ class HistoricalDataPipeline:
         # Agregar eventos históricos reales conocidos
         df = self.add_historical_solar_events(df)
         
-        # Guardar datos crudos
+        # Guardar datos crudos (escritura bloqueante fuera del event loop)
         raw_path = self.raw_dir / f"solar_historical_{start_year}_{end_year}.parquet"
-        df.to_parquet(raw_path, compression='gzip')
+        await asyncio.to_thread(self._write_parquet, df, raw_path)
         
         logger.info(f"✅ Datos solares recolectados: {len(df)} registros")
         return df
     
+    @staticmethod
+    def _write_parquet(df: pd.DataFrame, path: Path):
+        """Escribir parquet con zstd y diccionarios en columnas categóricas
+
+        zstd descomprime ~3x más rápido que gzip con ratio similar, y la
+        codificación por diccionario reduce drásticamente las columnas de
+        texto de baja cardinalidad (region, storm_name, ...).
+        """
+        dict_cols = [
+            col for col in ('region', 'data_source', 'storm_name', 'event_type')
+            if col in df.columns
+        ]
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False),
+            path,
+            compression='zstd',
+            compression_level=3,
+            use_dictionary=dict_cols,
+            row_group_size=50_000
+        )
+
+    def _load_historical_storms(self) -> pd.DataFrame:
+        """Cargar tabla de tormentas históricas (cacheada una vez por proceso)"""
+        if self._historical_storms is None:
+            storms_path = self.metadata_dir / "historical_storms.parquet"
+            if storms_path.exists():
+                self._historical_storms = pd.read_parquet(storms_path)
+            else:
+                # Sembrar la tabla con los eventos documentados por defecto;
+                # ampliarla solo requiere regenerar el parquet, sin tocar código
+                self._historical_storms = pd.DataFrame({
+                    'date': pd.to_datetime([
+                        '2012-03-09', '2015-03-17', '2017-09-06',
+                        '2021-10-29', '2023-04-23'
+                    ]),
+                    'event_intensity': [3, 2, 2, 1, 2],
+                    'storm_name': [
+                        'Carrington-class CME (near miss)',
+                        'St. Patrick Day Storm',
+                        'September 2017 X-class flares',
+                        'Halloween Solar Storm 2021',
+                        'April 2023 Geomagnetic Storm'
+                    ]
+                })
+                self._write_parquet(self._historical_storms, storms_path)
+        return self._historical_storms
+
     def add_historical_solar_events(self, df: pd.DataFrame) -> pd.DataFrame:
         """Agregar eventos solares históricos documentados"""
-        # Eventos de tormenta geomagnética históricos documentados
-        historical_storms = {
-            '2012-03-09': {'intensity': 3, 'name': 'Carrington-class CME (near miss)'},
-            '2015-03-17': {'intensity': 2, 'name': 'St. Patrick Day Storm'},
-            '2017-09-06': {'intensity': 2, 'name': 'September 2017 X-class flares'},
-            '2021-10-29': {'intensity': 1, 'name': 'Halloween Solar Storm 2021'},
-            '2023-04-23': {'intensity': 2, 'name': 'April 2023 Geomagnetic Storm'}
-        }
-        
-        # Marcar eventos históricos
-        for date_str, info in historical_storms.items():
-            date = pd.to_datetime(date_str)
-            if date in df['date'].values:
-                idx = df[df['date'] == date].index[0]
-                df.at[idx, 'geomagnetic_storm'] = 1
-                df.at[idx, 'storm_intensity'] = info['intensity']
-                df.at[idx, 'storm_name'] = info['name']
-        
+        # Marcar eventos históricos con un merge vectorizado (una sola pasada O(N)
+        # en lugar de un escaneo completo de la columna por cada evento)
+        events_df = self._load_historical_storms()
+
+        df = df.merge(events_df, on='date', how='left')
+        event_mask = df['event_intensity'].notna()
+        df['geomagnetic_storm'] = np.where(event_mask, 1, df['geomagnetic_storm'])
+        df['storm_intensity'] = df['event_intensity'].fillna(df['storm_intensity'])
+        df = df.drop(columns=['event_intensity'])
+
         return df
     
     async def collect_mental_health_data(self, start_year: int, end_year: int) -> pd.DataFrame:
@@ -184,42 +265,50 @@ class HistoricalDataPipeline:
         base_depression = 4.4  # Prevalencia base global (%) - OMS
         trend_increase = 0.05 * time / 12  # Aumento anual del 0.05%
         seasonal_component = 0.3 * np.sin(2 * np.pi * time / 12 + np.pi/4)  # Estacionalidad
-        noise = np.random.normal(0, 0.1, len(dates))
-        
+        normals = self._rng.standard_normal((6, len(dates)))
+        noise = 0.1 * normals[0]
+
         data = {
             'date': dates,
             'region': 'GLOBAL',
             'depression_prevalence': base_depression + trend_increase + seasonal_component + noise,
-            'anxiety_prevalence': 3.6 + 0.04 * time/12 + 0.2 * np.sin(2*np.pi*time/12) + np.random.normal(0, 0.1, len(dates)),
-            'suicide_rate': 10.5 + 0.02 * time/12 + 0.15 * np.sin(2*np.pi*time/12 + np.pi/2) + np.random.normal(0, 0.3, len(dates)),
-            'bipolar_disorder_prevalence': 0.6 + np.random.normal(0, 0.02, len(dates)),
-            'schizophrenia_prevalence': 0.3 + np.random.normal(0, 0.01, len(dates)),
-            'mental_health_service_coverage': 25 + 1.2 * time/12 + np.random.normal(0, 0.5, len(dates)),
+            'anxiety_prevalence': 3.6 + 0.04 * time/12 + 0.2 * np.sin(2*np.pi*time/12) + 0.1 * normals[1],
+            'suicide_rate': 10.5 + 0.02 * time/12 + 0.15 * np.sin(2*np.pi*time/12 + np.pi/2) + 0.3 * normals[2],
+            'bipolar_disorder_prevalence': 0.6 + 0.02 * normals[3],
+            'schizophrenia_prevalence': 0.3 + 0.01 * normals[4],
+            'mental_health_service_coverage': 25 + 1.2 * time/12 + 0.5 * normals[5],
             'data_source': 'WHO Global Health Observatory',
             'quality_rating': 8.5  # Calidad de datos (1-10)
         }
         
         df = pd.DataFrame(data)
         
-        # Agregar datos por región (simplificado)
-        regions_data = []
+        # Agregar datos por región (simplificado): expansión por broadcasting
+        # en lugar de copiar el DataFrame completo por región y concatenar
         regions = ['EUROPE', 'AMERICAS', 'WESTERN_PACIFIC', 'AFRICA', 'EASTERN_MEDITERRANEAN']
-        
-        for region in regions:
-            region_df = df.copy()
-            region_df['region'] = region
-            # Variación regional
-            region_factor = np.random.uniform(0.8, 1.2)
-            region_df['depression_prevalence'] *= region_factor
-            region_df['anxiety_prevalence'] *= region_factor
-            region_df['suicide_rate'] *= np.random.uniform(0.5, 1.5)
-            regions_data.append(region_df)
-        
-        all_data = pd.concat(regions_data, ignore_index=True)
+        n_regions = len(regions)
+        n_months = len(df)
+
+        # Variación regional (un factor por región, difundido a sus meses)
+        region_factors = np.repeat(self._rng.uniform(0.8, 1.2, n_regions), n_months)
+        suicide_factors = np.repeat(self._rng.uniform(0.5, 1.5, n_regions), n_months)
+
+        all_data = pd.DataFrame({
+            'date': np.tile(df['date'].to_numpy(), n_regions),
+            'region': np.repeat(regions, n_months),
+            'depression_prevalence': np.tile(df['depression_prevalence'].to_numpy(), n_regions) * region_factors,
+            'anxiety_prevalence': np.tile(df['anxiety_prevalence'].to_numpy(), n_regions) * region_factors,
+            'suicide_rate': np.tile(df['suicide_rate'].to_numpy(), n_regions) * suicide_factors,
+            'bipolar_disorder_prevalence': np.tile(df['bipolar_disorder_prevalence'].to_numpy(), n_regions),
+            'schizophrenia_prevalence': np.tile(df['schizophrenia_prevalence'].to_numpy(), n_regions),
+            'mental_health_service_coverage': np.tile(df['mental_health_service_coverage'].to_numpy(), n_regions),
+            'data_source': 'WHO Global Health Observatory',
+            'quality_rating': 8.5
+        })
         
         # Guardar
         raw_path = self.raw_dir / f"mental_health_historical_{start_year}_{end_year}.parquet"
-        all_data.to_parquet(raw_path, compression='gzip')
+        await asyncio.to_thread(self._write_parquet, all_data, raw_path)
         
         logger.info(f"✅ Datos de salud mental recolectados: {len(all_data)} registros")
         return all_data
@@ -232,16 +321,20 @@ class HistoricalDataPipeline:
         time = np.arange(len(dates))
         
         # Simular tendencias de búsqueda Google, actividad en redes, etc.
+        normals = self._rng.standard_normal((4, len(dates)))
         data = {
             'date': dates,
-            'google_trends_depression': 50 + 10 * np.sin(2*np.pi*time/12) + 0.5*time/12 + np.random.normal(0, 5, len(dates)),
-            'google_trends_anxiety': 45 + 8 * np.sin(2*np.pi*time/12 + np.pi/6) + 0.6*time/12 + np.random.normal(0, 4, len(dates)),
-            'google_trends_mental_health': 60 + 12 * np.sin(2*np.pi*time/12 + np.pi/3) + 0.8*time/12 + np.random.normal(0, 6, len(dates)),
-            'social_media_mentions': np.random.poisson(1000, len(dates)) + 20 * time/12,
-            'economic_stress_index': 5 + 0.1 * np.sin(2*np.pi*time/6) + np.random.normal(0, 0.5, len(dates)),
+            'google_trends_depression': 50 + 10 * np.sin(2*np.pi*time/12) + 0.5*time/12 + 5 * normals[0],
+            'google_trends_anxiety': 45 + 8 * np.sin(2*np.pi*time/12 + np.pi/6) + 0.6*time/12 + 4 * normals[1],
+            'google_trends_mental_health': 60 + 12 * np.sin(2*np.pi*time/12 + np.pi/3) + 0.8*time/12 + 6 * normals[2],
+            'social_media_mentions': self._rng.poisson(1000, len(dates)) + 20 * time/12,
+            'economic_stress_index': 5 + 0.1 * np.sin(2*np.pi*time/6) + 0.5 * normals[3],
             'seasonal_factor': np.sin(2*np.pi*(dates.month - 1)/12),  # Estacionalidad mensual
             'weekday_effect': dates.dayofweek / 6,  # Efecto día de semana
-            'holiday_effect': dates.isin(pd.date_range(f'{start_year}-12-20', f'{end_year}-01-10', freq='D')).astype(float)
+            # Ventana festiva de fin de año (20-dic a 10-ene) por comparación
+            # entera de mes/día, sin construir ni hashear un DatetimeIndex
+            'holiday_effect': (((dates.month == 12) & (dates.day >= 20)) |
+                               ((dates.month == 1) & (dates.day <= 10))).astype(float)
         }
         
         df = pd.DataFrame(data)
@@ -251,7 +344,7 @@ class HistoricalDataPipeline:
         df['economic_crisis_2008'] = ((dates >= '2008-09-01') & (dates <= '2009-12-31')).astype(float)
         
         raw_path = self.raw_dir / f"social_historical_{start_year}_{end_year}.parquet"
-        df.to_parquet(raw_path, compression='gzip')
+        await asyncio.to_thread(self._write_parquet, df, raw_path)
         
         logger.info(f"✅ Datos sociales recolectados: {len(df)} registros")
         return df
@@ -280,10 +373,15 @@ class HistoricalDataPipeline:
         # 6. Normalización y escalado para análisis
         normalized_data = self.normalize_for_analysis(imputed_data)
         
-        # Guardar datos procesados
-        for name, df in normalized_data.items():
-            processed_path = self.processed_dir / f"{name}_processed.parquet"
-            df.to_parquet(processed_path, compression='gzip')
+        # Guardar datos procesados (escrituras en paralelo fuera del event loop)
+        await asyncio.gather(*[
+            asyncio.to_thread(
+                self._write_parquet,
+                df,
+                self.processed_dir / f"{name}_processed.parquet"
+            )
+            for name, df in normalized_data.items()
+        ])
         
         logger.info("✅ Datos procesados y validados")
         return normalized_data
@@ -297,10 +395,12 @@ class HistoricalDataPipeline:
         df_clean = df_clean[df_clean['solar_wind_speed'].between(200, 1000)]  # km/s
         df_clean = df_clean[df_clean['kp_index'].between(0, 9)]
         
-        # Detección de outliers usando método estadístico
-        from scipy import stats
-        z_scores = np.abs(stats.zscore(df_clean.select_dtypes(include=[np.number])))
-        df_clean = df_clean[(z_scores < 3).all(axis=1)]
+        # Detección de outliers usando método estadístico (z-score con media y
+        # desviación en una pasada numpy, sin las copias de scipy.stats.zscore)
+        num = df_clean.select_dtypes(include=[np.number]).to_numpy()
+        mu = num.mean(axis=0)
+        sd = num.std(axis=0)
+        df_clean = df_clean[(np.abs(num - mu) < 3 * sd).all(axis=1)]
         
         return df_clean
     
@@ -309,14 +409,34 @@ class HistoricalDataPipeline:
                          social_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         """Alinear todas las series temporales a frecuencia mensual"""
         
-        # Resample solar a mensual (promedio)
-        solar_monthly = solar_df.set_index('date').resample('M').agg({
-            'sunspot_number': 'mean',
-            'kp_index': 'mean',
-            'solar_wind_speed': 'mean',
-            'geomagnetic_storm': 'sum',  # Conteo de tormentas
-            'storm_intensity': 'max'     # Intensidad máxima
-        }).reset_index()
+        # Resample solar a mensual con los kernels de agregación de Arrow
+        # (multihilo y sin GIL, frente al dispatch Python del groupby de pandas)
+        tbl = pa.Table.from_pandas(solar_df, preserve_index=False)
+        tbl = tbl.append_column('month', pc.strftime(tbl['date'], '%Y-%m'))
+        agg = tbl.group_by('month').aggregate([
+            ('sunspot_number', 'mean'),
+            ('kp_index', 'mean'),
+            ('solar_wind_speed', 'mean'),
+            ('geomagnetic_storm', 'sum'),  # Conteo de tormentas
+            ('storm_intensity', 'max')     # Intensidad máxima
+        ])
+        solar_monthly = agg.to_pandas().rename(columns={
+            'sunspot_number_mean': 'sunspot_number',
+            'kp_index_mean': 'kp_index',
+            'solar_wind_speed_mean': 'solar_wind_speed',
+            'geomagnetic_storm_sum': 'geomagnetic_storm',
+            'storm_intensity_max': 'storm_intensity'
+        }).sort_values('month')
+        # Restaurar la etiqueta fin-de-mes que producía resample('M')
+        solar_monthly['date'] = (
+            pd.PeriodIndex(solar_monthly['month'], freq='M')
+            .to_timestamp(how='end').normalize()
+        )
+        solar_monthly = solar_monthly.drop(columns=['month']).reset_index(drop=True)
+        solar_monthly = solar_monthly[[
+            'date', 'sunspot_number', 'kp_index', 'solar_wind_speed',
+            'geomagnetic_storm', 'storm_intensity'
+        ]]
         
         # Salud mental ya está mensual
         mental_monthly = mental_df.copy()
@@ -380,33 +500,63 @@ class HistoricalDataPipeline:
             'suicide_rate': (0, 50)  # por 100k
         }
         
+        # Todas las columnas aplicables se concatenan y comparan en un único
+        # kernel vectorizado en lugar de una llamada a .between por columna
+        check_keys = []
+        check_arrays = []
+        check_lows = []
+        check_highs = []
         for var, (min_val, max_val) in range_checks.items():
             for name, df in processed_data.items():
                 if var in df.columns:
-                    in_range = df[var].between(min_val, max_val).mean()
-                    
-                    validation_report['validation_criteria'][f'{var}_range_check'] = {
-                        'required': 0.99,
-                        'actual': round(in_range, 3),
-                        'passed': in_range >= 0.99
-                    }
+                    check_keys.append(var)
+                    check_arrays.append(df[var].to_numpy(dtype=np.float64))
+                    check_lows.append(min_val)
+                    check_highs.append(max_val)
+
+        if check_arrays:
+            sizes = np.array([arr.size for arr in check_arrays])
+            flat = np.concatenate(check_arrays)
+            lo = np.repeat(check_lows, sizes)
+            hi = np.repeat(check_highs, sizes)
+            in_range_flat = (flat >= lo) & (flat <= hi)
+            offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            in_range_fracs = np.add.reduceat(in_range_flat, offsets) / sizes
+
+            for var, in_range in zip(check_keys, in_range_fracs):
+                in_range = float(in_range)
+                validation_report['validation_criteria'][f'{var}_range_check'] = {
+                    'required': 0.99,
+                    'actual': round(in_range, 3),
+                    'passed': in_range >= 0.99
+                }
         
         # 4. Pruebas estadísticas básicas
+        shapiro_rng = np.random.default_rng(0)
         for name, df in processed_data.items():
             numeric_cols = df.select_dtypes(include=[np.number]).columns
-            
+
             for col in numeric_cols:
-                # Test de normalidad (Shapiro-Wilk para n < 5000)
-                if len(df) < 5000:
-                    from scipy import stats
-                    stat, p_value = stats.shapiro(df[col].dropna())
-                    
-                    validation_report['results'][f'{name}_{col}_normality'] = {
-                        'test': 'Shapiro-Wilk',
-                        'statistic': round(stat, 4),
-                        'p_value': round(p_value, 4),
-                        'normal': p_value > 0.05
-                    }
+                # Test de normalidad (Shapiro-Wilk sobre máximo 5000 puntos)
+                arr = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                arr = arr[~np.isnan(arr)]
+
+                # Saltar columnas degeneradas (constantes o casi vacías)
+                if arr.size < 3 or arr.std() == 0:
+                    continue
+
+                if arr.size > 5000:
+                    arr = shapiro_rng.choice(arr, 5000, replace=False)
+
+                stat, p_value = shapiro(arr)
+                stat, p_value = float(stat), float(p_value)
+
+                validation_report['results'][f'{name}_{col}_normality'] = {
+                    'test': 'Shapiro-Wilk',
+                    'statistic': round(stat, 4),
+                    'p_value': round(p_value, 4),
+                    'normal': p_value > 0.05
+                }
         
         # Guardar reporte de validación
         validation_path = self.metadata_dir / "validation_report.json"
@@ -416,51 +566,64 @@ class HistoricalDataPipeline:
         logger.info(f"✅ Validación completada: {'PASÓ' if validation_report['passed'] else 'FALLÓ'}")
         return validation_report
     
-    async def generate_scientific_derivatives(self, processed_data: Dict[str, pd.DataFrame]) -> Dict:
+    async def generate_scientific_derivatives(self, processed_data: Dict[str, pd.DataFrame],
+                                              merged: Optional[pd.DataFrame] = None) -> Dict:
         """Generar datasets derivados para análisis específicos"""
         logger.info("Generando derivados científicos...")
-        
+
         derivatives = {}
-        
+
         # 1. Dataset de correlaciones pre-calculadas
-        solar_df = processed_data['solar']
-        mental_df = processed_data['mental_health']
-        
-        # Alinear por fecha
-        merged = pd.merge(solar_df, mental_df, on='date', how='inner')
-        
-        # Calcular correlaciones móviles
+        # Alinear por fecha (reutilizar el merge si el llamador ya lo calculó)
+        if merged is None:
+            merged = pd.merge(processed_data['solar'], processed_data['mental_health'],
+                              on='date', how='inner')
+        
+        # Calcular correlaciones móviles compartiendo los momentos rodantes por
+        # ventana: corr = (E[xy] - E[x]E[y]) / sqrt(var(x)·var(y)). Una pasada
+        # de media/varianza por columna en lugar de 12 llamadas a rolling.corr
         window_sizes = [3, 6, 12]  # meses
-        correlation_data = []
-        
+        solar_vars = ['sunspot_number', 'kp_index']
+        mental_vars = ['depression_prevalence', 'suicide_rate']
+        corr_blocks = []
+        nobs_blocks = []
+        block_labels = []
+
         for window in window_sizes:
-            for solar_var in ['sunspot_number', 'kp_index']:
-                for mental_var in ['depression_prevalence', 'suicide_rate']:
-                    # Correlación móvil
-                    rolling_corr = merged[solar_var].rolling(window=window).corr(merged[mental_var])
-                    
-                    correlation_data.append({
-                        'date': merged['date'],
-                        'solar_variable': solar_var,
-                        'mental_variable': mental_var,
-                        'window_months': window,
-                        'correlation': rolling_corr.values,
-                        'n_observations': merged[solar_var].rolling(window=window).count().values
-                    })
-        
-        # Crear DataFrame de correlaciones
-        corr_dfs = []
-        for corr_data in correlation_data:
-            df = pd.DataFrame(corr_data)
-            corr_dfs.append(df)
-        
-        if corr_dfs:
-            all_correlations = pd.concat(corr_dfs, ignore_index=True)
+            roll = merged[solar_vars + mental_vars].rolling(window=window)
+            means = roll.mean()
+            variances = roll.var(ddof=0)
+            counts = roll.count()
+
+            for solar_var in solar_vars:
+                for mental_var in mental_vars:
+                    # Correlación móvil a partir de los momentos compartidos
+                    mean_xy = (merged[solar_var] * merged[mental_var]).rolling(window=window).mean()
+                    cov = mean_xy - means[solar_var] * means[mental_var]
+                    rolling_corr = cov / np.sqrt(variances[solar_var] * variances[mental_var])
+
+                    # float32 basta para correlaciones y reduce el dataset a la mitad
+                    corr_blocks.append(rolling_corr.to_numpy(dtype=np.float32))
+                    nobs_blocks.append(counts[solar_var].to_numpy())
+                    block_labels.append((solar_var, mental_var, window))
+
+        # Crear DataFrame de correlaciones en una sola construcción: las fechas
+        # se tilan una vez en lugar de copiar la columna por cada bloque
+        if corr_blocks:
+            n_rows = len(merged)
+            all_correlations = pd.DataFrame({
+                'date': np.tile(merged['date'].to_numpy(), len(corr_blocks)),
+                'solar_variable': np.repeat([s for s, _, _ in block_labels], n_rows),
+                'mental_variable': np.repeat([m for _, m, _ in block_labels], n_rows),
+                'window_months': np.repeat([w for _, _, w in block_labels], n_rows),
+                'correlation': np.concatenate(corr_blocks),
+                'n_observations': np.concatenate(nobs_blocks)
+            })
             derivatives['correlations'] = all_correlations
             
             # Guardar
             corr_path = self.processed_dir / "precalculated_correlations.parquet"
-            all_correlations.to_parquet(corr_path, compression='gzip')
+            self._write_parquet(all_correlations, corr_path)
         
         # 2. Dataset de eventos extremos
         extreme_events = self.identify_extreme_events(processed_data)
@@ -480,10 +643,16 @@ class HistoricalDataPipeline:
         
         # Definir umbrales para eventos extremos
         extreme_solar = solar_df[solar_df['kp_index'] >= 6]  # Tormentas fuertes
-        extreme_mental = mental_df[
-            (mental_df['suicide_rate'] > mental_df['suicide_rate'].quantile(0.95)) |
-            (mental_df['depression_prevalence'] > mental_df['depression_prevalence'].quantile(0.95))
-        ]
+
+        # Percentil 95 por selección parcial O(N) (np.partition), calculado
+        # una sola vez por variable en lugar de un sort completo por consulta
+        suicide = mental_df['suicide_rate'].to_numpy()
+        depression = mental_df['depression_prevalence'].to_numpy()
+        k = min(int(0.95 * len(mental_df)), len(mental_df) - 1)
+        suicide_q95 = np.partition(suicide, k)[k]
+        depression_q95 = np.partition(depression, k)[k]
+
+        extreme_mental = mental_df[(suicide > suicide_q95) | (depression > depression_q95)]
         
         # Combinar y enriquecer
         extreme_events = pd.concat([
@@ -667,14 +836,10 @@ abstract: "{self.metadata.description}"
         
         package_name = f"heliobio_dataset_v{self.metadata.version.replace('.', '_')}"
         package_path = self.data_dir.parent / f"{package_name}.zip"
-        
-        with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Agregar todos los archivos relevantes
-            for file_path in self.data_dir.rglob('*'):
-                if file_path.is_file():
-                    arcname = file_path.relative_to(self.data_dir.parent)
-                    zipf.write(file_path, arcname)
-        
+
+        # Construcción del zip fuera del event loop (I/O + compresión bloqueantes)
+        await asyncio.to_thread(self._build_zip, package_path)
+
         # Calcular checksum para integridad
         checksum = self.calculate_checksum(package_path)
         
@@ -686,16 +851,36 @@ abstract: "{self.metadata.description}"
         logger.info(f"   Checksum SHA256: {checksum}")
         
         return package_path
-    
+
+    def _build_zip(self, package_path: Path):
+        """Construir el zip del dataset para publicación"""
+        with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            # Agregar todos los archivos relevantes; los .parquet ya vienen
+            # comprimidos, re-deflatarlos solo quema CPU sin ganar tamaño.
+            # Copia en streaming por bloques: la memoria pico queda acotada
+            # por el buffer en lugar de por el archivo más grande del dataset
+            for file_path in self.data_dir.rglob('*'):
+                if file_path.is_file():
+                    arcname = str(file_path.relative_to(self.data_dir.parent))
+                    compress_type = (zipfile.ZIP_STORED if file_path.suffix == '.parquet'
+                                     else zipfile.ZIP_DEFLATED)
+                    info = zipfile.ZipInfo.from_file(file_path, arcname)
+                    info.compress_type = compress_type
+                    with open(file_path, 'rb') as src, zipf.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst, length=1 << 20)
+
     def calculate_checksum(self, file_path: Path) -> str:
         """Calcular checksum SHA256 para verificación de integridad"""
-        sha256_hash = hashlib.sha256()
-        
         with open(file_path, 'rb') as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
+            # Python 3.11+: lectura en C con buffer auto-ajustado
+            if hasattr(hashlib, 'file_digest'):
+                return hashlib.file_digest(f, 'sha256').hexdigest()
+
+            # Fallback: bloques de 1 MiB para amortizar el bucle Python
+            sha256_hash = hashlib.sha256()
+            for byte_block in iter(lambda: f.read(1 << 20), b""):
                 sha256_hash.update(byte_block)
-        
-        return sha256_hash.hexdigest()
+            return sha256_hash.hexdigest()
 
 # Ejecutar pipeline
 async def main():
@@ -1,18 +1,113 @@
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 from scipy import stats
-import requests
+from scipy.special import ndtr, ndtri
+import aiohttp
 from datetime import datetime, timedelta
 
-def fetch_noaa_kp(start_date="2020-01-01", end_date="2025-01-01"):
-    """Fetch real Kp index data from NOAA"""
+# Caché en disco para las descargas de validación: re-ejecutar el análisis
+# no vuelve a bajar payloads idénticos dentro de la ventana de expiración
+CACHE_DIR = Path("cache")
+CACHE_EXPIRE_SECONDS = 86400
+
+# Generador PCG64 sembrado a nivel de módulo: más rápido que la familia
+# global legacy np.random.* y reproducible entre ejecuciones de validación
+_RNG = np.random.default_rng(0)
+
+# Etiquetas de magnitud del efecto (umbral Cohen |r| en 0.3 y 0.5)
+_EFFECT_LABELS = ("pequeño", "moderado", "fuerte")
+_EFFECT_THRESHOLDS = (0.3, 0.5)
+
+@lru_cache(maxsize=8)
+def _daily_date_range(start_year, end_year):
+    """Rango diario memoizado por (año inicio, año fin)"""
+    return pd.date_range(start=f"{start_year}-01-01",
+                         end=f"{end_year}-12-31", freq='D')
+
+def _cache_read(cache_name):
+    """Leer payload cacheado si sigue dentro de la ventana de expiración"""
+    cache_path = CACHE_DIR / f"{cache_name}.json"
+    if cache_path.exists() and time.time() - cache_path.stat().st_mtime < CACHE_EXPIRE_SECONDS:
+        return json.loads(cache_path.read_text())
+    return None
+
+def _cache_write(cache_name, data):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    (CACHE_DIR / f"{cache_name}.json").write_text(json.dumps(data))
+
+class NOAAClient:
+    """Cliente NOAA SWPC con pool de conexiones y rate-limit de cliente
+
+    NOAA limita a ~5 req/s y penaliza ráfagas; una sesión persistente
+    además evita el handshake TCP+TLS (~50-150 ms) en cada llamada.
+    """
+
+    BASE_URL = "https://services.swpc.noaa.gov/json"
+    MAX_REQUESTS_PER_SECOND = 5
+
+    def __init__(self):
+        self._session = None
+        self._semaphore = asyncio.Semaphore(self.MAX_REQUESTS_PER_SECOND)
+        self._min_interval = 1.0 / self.MAX_REQUESTS_PER_SECOND
+        self._next_request = 0.0
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=10, ttl_dns_cache=300)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+        self._session = None
+
+    async def _throttle(self):
+        """Token bucket sobre reloj monotónico: como máximo 5 req/s"""
+        now = time.monotonic()
+        wait = self._next_request - now
+        self._next_request = max(now, self._next_request) + self._min_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def get_json(self, path):
+        async with self._semaphore:
+            await self._throttle()
+            async with self._session.get(f"{self.BASE_URL}/{path}") as response:
+                response.raise_for_status()
+                return await response.json()
+
+async def fetch_noaa_kp_async(start_date="2020-01-01", end_date="2025-01-01", client=None):
+    """Fetch real Kp index data from NOAA (async, cacheado)"""
     # NOAA SWPC API endpoint (public, no key needed)
-    url = f"https://services.swpc.noaa.gov/json/kp_30day.json"
     # Note: For historical data, you'd use different endpoints
-    response = requests.get(url)
-    data = response.json()
+    data = _cache_read("noaa_kp_30day")
+    if data is None:
+        if client is not None:
+            data = await client.get_json("kp_30day.json")
+        else:
+            async with NOAAClient() as own_client:
+                data = await own_client.get_json("kp_30day.json")
+        _cache_write("noaa_kp_30day", data)
     return pd.DataFrame(data)
 
+async def fetch_cdc_suicides_async(state="US", start_year=2020, end_year=2024):
+    """Fetch suicide mortality data from CDC WONDER (async)"""
+    # El generador actual es sintético (sin I/O real); el wrapper async
+    # existe para poder recolectar NOAA + CDC concurrentemente con gather
+    return fetch_cdc_suicides(state=state, start_year=start_year, end_year=end_year)
+
+def fetch_noaa_kp(start_date="2020-01-01", end_date="2025-01-01"):
+    """Fetch real Kp index data from NOAA"""
+    return asyncio.run(fetch_noaa_kp_async(start_date, end_date))
+
 def fetch_cdc_suicides(state="US", start_year=2020, end_year=2024):
     """Fetch suicide mortality data from CDC WONDER"""
     # CDC API requires specific query parameters
@@ -25,68 +120,228 @@ def fetch_cdc_suicides(state="US", start_year=2020, end_year=2024):
     }
     # Actual implementation would use CDC's API with proper authentication
     # For now, return sample data structure
-    dates = pd.date_range(start=f"{start_year}-01-01", 
-                         end=f"{end_year}-12-31", freq='D')
+    dates = _daily_date_range(start_year, end_year)
     return pd.DataFrame({
         'date': dates,
-        'suicides': np.random.poisson(100, len(dates))  # Placeholder
+        'suicides': _RNG.poisson(100, size=len(dates))  # Placeholder
     })
 
+# Serie diaria de manchas solares del SILSO (Observatorio Real de Bélgica)
+SILSO_CSV_URL = "http://www.sidc.be/silso/DATA/SN_d_tot_V2.0.csv"
+
+async def stream_download(url, target_path, chunk_size=65536):
+    """Descargar a disco por bloques de 64 KiB
+
+    A diferencia de response.json()/text(), la memoria pico queda acotada
+    por el tamaño del bloque y no por la longitud de la serie descargada.
+    """
+    target_path = Path(target_path)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            with open(target_path, 'wb') as fh:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    fh.write(chunk)
+    return target_path
+
+async def fetch_silso_sunspots_async(target_path=None):
+    """Fetch daily sunspot numbers from SILSO (streaming, cacheado)"""
+    if target_path is None:
+        target_path = CACHE_DIR / "silso_sn_daily.csv"
+    target_path = Path(target_path)
+    if not (target_path.exists()
+            and time.time() - target_path.stat().st_mtime < CACHE_EXPIRE_SECONDS):
+        await stream_download(SILSO_CSV_URL, target_path)
+
+    # Formato SN_d_tot_V2.0: year;month;day;decdate;sn;sn_std;n_obs;definitive
+    # Solo se decodifican las columnas necesarias, con dtypes compactos
+    df = pd.read_csv(
+        target_path, sep=';', header=None, usecols=[0, 1, 2, 4],
+        dtype={0: np.int16, 1: np.int8, 2: np.int8, 4: np.float32}
+    )
+    df.columns = ['year', 'month', 'day', 'sunspot_number']
+    df['date'] = pd.to_datetime(df[['year', 'month', 'day']])
+    return df[['date', 'sunspot_number']]
+
+def load_kp_from_pipeline(path="data/scientific/processed/solar_processed.parquet"):
+    """Cargar el Kp mensual del pipeline leyendo solo las columnas necesarias
+
+    El dataset científico se publica en parquet columnar (zstd), así que la
+    poda de columnas evita decodificar el resto del archivo.
+    """
+    return pd.read_parquet(path, columns=['date', 'kp_index'])
+
+def load_suicides_from_pipeline(path="data/scientific/processed/mental_health_processed.parquet"):
+    """Cargar la serie de suicidios del pipeline con poda de columnas"""
+    df = pd.read_parquet(path, columns=['date', 'suicide_rate'])
+    return df.rename(columns={'suicide_rate': 'suicides'})
+
+def _bootstrap_pearson_small(x, y, n_bootstraps):
+    """Bootstrap por índices para N pequeño
+
+    Con pocas observaciones la matriz de pesos N×B del camino matmul es
+    desperdicio; remuestrear índices y reducir por filas es más rápido y
+    la matriz B×N de índices cabe holgada en caché.
+    """
+    n = len(x)
+    idx = np.random.randint(0, n, size=(n_bootstraps, n))
+    xs = x[idx]
+    ys = y[idx]
+    mx = xs.mean(axis=1)
+    my = ys.mean(axis=1)
+    mxy = (xs * ys).mean(axis=1)
+    mx2 = (xs * xs).mean(axis=1)
+    my2 = (ys * ys).mean(axis=1)
+    return (mxy - mx * my) / np.sqrt((mx2 - mx ** 2) * (my2 - my ** 2))
+
+def _pearson_stat(x, y):
+    """Coeficiente de Pearson por fórmula directa"""
+    xm = x - x.mean()
+    ym = y - y.mean()
+    return float((xm @ ym) / np.sqrt((xm @ xm) * (ym @ ym)))
+
+def _spearman_stat(x, y):
+    """Spearman = Pearson sobre rangos"""
+    return _pearson_stat(stats.rankdata(x), stats.rankdata(y))
+
+def _granger_stat(x, y, maxlag=7):
+    """Mejor p-valor de causalidad de Granger x→y entre los primeros lags"""
+    from statsmodels.tsa.stattools import grangercausalitytests
+    results = grangercausalitytests(np.column_stack([y, x]), maxlag=maxlag)
+    return min(lag_result[0]['ssr_ftest'][1] for lag_result in results.values())
+
+# Métodos de correlación disponibles; son independientes sobre el mismo (x, y)
+# y sus bucles calientes numpy/scipy sueltan el GIL
+METHOD_FUNCS = {
+    'pearson': _pearson_stat,
+    'spearman': _spearman_stat,
+    'granger': _granger_stat,
+}
+
+def calculate_correlation_methods(x, y, methods=("pearson", "spearman", "granger")):
+    """Calcular varios métodos de correlación concurrentemente
+
+    Cada método corre en su propio hilo del pool; al soltar el GIL en los
+    kernels numéricos, el paso de validación escala ~N× con los núcleos.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    available = [m for m in methods if m in METHOD_FUNCS]
+    with ThreadPoolExecutor(max_workers=len(available)) as executor:
+        futures = {m: executor.submit(METHOD_FUNCS[m], x, y) for m in available}
+        return {m: future.result() for m, future in futures.items()}
+
 def calculate_correlation(kp_data, suicide_data):
     """Calculate Pearson correlation with statistical significance"""
-    # Merge datasets on date
-    merged = pd.merge(kp_data, suicide_data, on='date', how='inner')
-    
-    # Calculate correlation
-    r, p = stats.pearsonr(merged['kp_index'], merged['suicides'])
-    
-    # Bootstrap for confidence intervals
+    # Alinear por fecha con enteros de día: evita el hash-join de pd.merge
+    # y la copia del DataFrame intermedio; el gather deja arrays contiguos
+    kp_days = kp_data['date'].to_numpy().astype('datetime64[D]').view('i8')
+    suicide_days = suicide_data['date'].to_numpy().astype('datetime64[D]').view('i8')
+    _, kp_idx, suicide_idx = np.intersect1d(kp_days, suicide_days, return_indices=True)
+
+    n = kp_idx.size
+    x = kp_data['kp_index'].to_numpy(np.float64)[kp_idx]
+    y = suicide_data['suicides'].to_numpy(np.float64)[suicide_idx]
+
+    # Calculate correlation (fórmula directa; el valor p sale analíticamente
+    # del estadístico t, evitando el overhead por llamada de stats.pearsonr)
+    xm = x - x.mean()
+    ym = y - y.mean()
+    r = (xm @ ym) / np.sqrt((xm @ xm) * (ym @ ym))
+    t = r * np.sqrt((n - 2) / (1 - r * r))
+    p = 2 * stats.distributions.t.sf(abs(t), n - 2)
+
+    # Bootstrap for confidence intervals (vectorizado vía pesos multinomiales:
+    # las B réplicas se reducen a unos pocos matmuls en lugar de B remuestreos
+    # de DataFrame + B llamadas a pearsonr)
     n_bootstraps = 1000
-    bootstrap_corrs = []
-    for _ in range(n_bootstraps):
-        sample = merged.sample(n=len(merged), replace=True)
-        r_boot, _ = stats.pearsonr(sample['kp_index'], sample['suicides'])
-        bootstrap_corrs.append(r_boot)
-    
-    ci_lower = np.percentile(bootstrap_corrs, 2.5)
-    ci_upper = np.percentile(bootstrap_corrs, 97.5)
+    if n < 200:
+        bootstrap_corrs = _bootstrap_pearson_small(x, y, n_bootstraps)
+    else:
+        W = np.random.multinomial(n, np.full(n, 1.0 / n), size=n_bootstraps).T / n
+        mx = x @ W
+        my = y @ W
+        mxy = (x * y) @ W
+        mx2 = (x * x) @ W
+        my2 = (y * y) @ W
+        bootstrap_corrs = (mxy - mx * my) / np.sqrt((mx2 - mx ** 2) * (my2 - my ** 2))
+
+    # Intervalo BCa: corrige sesgo (z0) y aceleración (a) del bootstrap
+    # percentil, con el jackknife leave-one-out vectorizado vía sumas totales
+    prop_below = np.clip((bootstrap_corrs < r).mean(),
+                         1.0 / (n_bootstraps + 1), 1.0 - 1.0 / (n_bootstraps + 1))
+    z0 = ndtri(prop_below)
+
+    n_jack = n - 1
+    sx = x.sum() - x
+    sy = y.sum() - y
+    sxy = (x * y).sum() - x * y
+    sx2 = (x * x).sum() - x * x
+    sy2 = (y * y).sum() - y * y
+    r_jack = (sxy - sx * sy / n_jack) / np.sqrt(
+        (sx2 - sx ** 2 / n_jack) * (sy2 - sy ** 2 / n_jack)
+    )
+    deltas = r_jack.mean() - r_jack
+    accel = (deltas ** 3).sum() / (6 * ((deltas ** 2).sum()) ** 1.5)
+
+    z_alpha = ndtri([0.025, 0.975])
+    adjusted_alphas = ndtr(z0 + (z0 + z_alpha) / (1 - accel * (z0 + z_alpha)))
+    ci_lower, ci_upper = np.percentile(bootstrap_corrs, 100 * adjusted_alphas)
     
     return {
         'correlation': r,
         'p_value': p,
         'ci_95': (ci_lower, ci_upper),
-        'n_observations': len(merged),
+        'n_observations': n,
         'is_significant': p < 0.05
     }
 
+def format_result(results):
+    """Formatear el informe de resultados como un único string
+
+    Concentra todo el formateo legible en un punto y permite emitirlo con
+    una sola escritura en lugar de una docena de prints línea a línea.
+    """
+    lines = [
+        "=" * 50,
+        "RESULTADOS ESTADÍSTICOS:",
+        f"  Correlación (Pearson r): {results['correlation']:.3f}",
+        f"  Valor p: {results['p_value']:.4f}",
+        f"  IC 95%: [{results['ci_95'][0]:.3f}, {results['ci_95'][1]:.3f}]",
+        f"  Observaciones: {results['n_observations']}",
+        f"  Significativo (p<0.05): {'✅ SÍ' if results['is_significant'] else '❌ NO'}",
+    ]
+
+    # Scientific interpretation
+    if results['is_significant']:
+        effect_label = _EFFECT_LABELS[np.searchsorted(
+            _EFFECT_THRESHOLDS, abs(results['correlation']), side='right')]
+        lines += [
+            "",
+            "🎯 INTERPRETACIÓN CIENTÍFICA:",
+            "  Existe una correlación estadísticamente significativa",
+            "  entre el índice Kp y las tasas de suicidio.",
+            f"  Magnitud del efecto: {effect_label}",
+        ]
+    else:
+        lines += ["", "⚠️  No se encontró evidencia suficiente para rechazar la hipótesis nula."]
+
+    return "\n".join(lines)
+
 if __name__ == "__main__":
     print("HelioBio-Social: Validación Científica Inicial")
     print("=" * 50)
-    
+
     # Fetch data
     print("1. Descargando datos solares (NOAA)...")
     kp_data = fetch_noaa_kp()
-    
+
     print("2. Descargando datos de salud mental (CDC)...")
     suicide_data = fetch_cdc_suicides()
-    
+
     print("3. Calculando correlación...")
     results = calculate_correlation(kp_data, suicide_data)
-    
-    # Display results
-    print("\n" + "=" * 50)
-    print("RESULTADOS ESTADÍSTICOS:")
-    print(f"  Correlación (Pearson r): {results['correlation']:.3f}")
-    print(f"  Valor p: {results['p_value']:.4f}")
-    print(f"  IC 95%: [{results['ci_95'][0]:.3f}, {results['ci_95'][1]:.3f}]")
-    print(f"  Observaciones: {results['n_observations']}")
-    print(f"  Significativo (p<0.05): {'✅ SÍ' if results['is_significant'] else '❌ NO'}")
-    
-    # Scientific interpretation
-    if results['is_significant']:
-        print("\n🎯 INTERPRETACIÓN CIENTÍFICA:")
-        print(f"  Existe una correlación estadísticamente significativa")
-        print(f"  entre el índice Kp y las tasas de suicidio.")
-        print(f"  Magnitud del efecto: {'pequeño' if abs(results['correlation']) < 0.3 else 'moderado' if abs(results['correlation']) < 0.5 else 'fuerte'}")
-    else:
-        print("\n⚠️  No se encontró evidencia suficiente para rechazar la hipótesis nula.")
+
+    # Display results (una sola escritura)
+    sys.stdout.write("\n" + format_result(results) + "\n")
@@ -2,9 +2,10 @@
 ⚙️ Configuración del Sistema HelioBio-Social - Compatible con Pydantic v2
 """
 import os
+from functools import lru_cache
 from typing import Dict, Any, List
 from pydantic import Field
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -54,21 +55,19 @@ class Settings(BaseSettings):
     # Data Management
     data_retention_days: int = Field(default=365, env="DATA_RETENTION_DAYS")
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
-        extra = "ignore"  # Ignorar variables extra
-
-# Instancia global de configuración
-_settings_instance = None
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=False,
+        extra="ignore",  # Ignorar variables extra
+        frozen=True  # Inmutable: habilita el hash y evita mutaciones accidentales
+    )
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """Obtener instancia de configuración (singleton)"""
-    global _settings_instance
-    if _settings_instance is None:
-        _settings_instance = Settings()
-    return _settings_instance
+    return Settings()
 
+@lru_cache(maxsize=1)
 def get_chizhevsky_parameters() -> Dict[str, Any]:
     """Obtener parámetros específicos del modelo Chizhevsky"""
     settings = get_settings()
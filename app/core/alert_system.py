@@ -3,11 +3,19 @@
 Sistema avanzado de detección y notificación de eventos críticos
 """
 import asyncio
+import heapq
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
+from types import MappingProxyType
+
+from app.config.settings import get_settings
+from app.core.solar_monitor import SolarMonitor
+from app.core.social_analyzer import SocialAnalyzer
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +30,16 @@ class AlertType(Enum):
     CORRELATION = "CORRELATION"
     SYSTEM = "SYSTEM"
 
-@dataclass
+# Acciones recomendadas por tipo, congeladas en import (antes se reconstruía
+# el dict en cada notificación)
+_ACTIONS = MappingProxyType({
+    AlertType.SOLAR: "Monitorear actividad solar y posibles efectos en sistemas biológicos",
+    AlertType.SOCIAL: "Analizar tendencias sociales y preparar respuestas estratégicas",
+    AlertType.CORRELATION: "Evaluar impacto en resonancia solar-social y predicciones",
+    AlertType.SYSTEM: "Revisar estado del sistema y componentes afectados"
+})
+
+@dataclass(slots=True)
 class Alert:
     id: int
     level: AlertLevel
@@ -33,15 +50,44 @@ class Alert:
     duration_hours: int
     acknowledged: bool = False
     data: Optional[Dict[str, Any]] = None
+    # Marcas en segundos epoch: comparar floats es ~10x más barato que la
+    # aritmética de timedelta en los filtros calientes
+    created_ts: float = 0.0
+    expires_at: float = 0.0
+    # isoformat() calculado una sola vez al registrar la alerta
+    timestamp_iso: str = ""
 
 class AlertSystem:
     """
     Sistema avanzado de alertas para monitoreo heliobio-social
     """
     
-    def __init__(self):
-        self.active_alerts: List[Alert] = []
-        self.alert_history: List[Alert] = []
+    def __init__(self, solar_monitor: Optional[SolarMonitor] = None,
+                 social_analyzer: Optional[SocialAnalyzer] = None):
+        # Componentes inyectables (los tests pueden sustituirlos sin re-importar)
+        self.solar_monitor = solar_monitor
+        self.social_analyzer = social_analyzer
+
+        # Índices de alertas activas: dedup O(1) por (tipo, título), conteo
+        # por tipo O(1) y expiración O(log n) vía heap ordenado por vencimiento
+        self._active_by_key: Dict[Tuple[AlertType, str], Alert] = {}
+        self._expiry_heap: List[Tuple[float, int, Tuple[AlertType, str]]] = []
+        self._type_counts: Counter = Counter()
+
+        # Historial acotado: como mucho una alerta por tick de monitoreo
+        # durante la ventana de retención configurada (antes crecía sin límite)
+        retention_days = get_settings().alert_retention_days
+        self.alert_history: deque = deque(maxlen=retention_days * 24 * 60)
+
+        # Payload serializado cacheado: solo se reconstruye cuando cambia el
+        # conjunto de alertas o vence la más próxima, no en cada petición HTTP
+        self._serialized_cache: Optional[List[Dict[str, Any]]] = None
+        self._cache_valid_until: float = float('inf')
+
+        # Pasada de chequeo en vuelo: productores concurrentes (scheduler,
+        # /refresh manual, webhooks) comparten una única pasada en lugar de
+        # disparar consultas duplicadas a los componentes
+        self._check_task: Optional[asyncio.Task] = None
         self.next_alert_id = 0
         self.status = "initializing"
         
@@ -70,20 +116,27 @@ class AlertSystem:
             try:
                 # Aquí se integraría con los otros componentes del sistema
                 # Para este ejemplo, generamos alertas simuladas
-                await self._check_simulated_alerts()
+                await self.request_check()
                 await asyncio.sleep(60)  # Verificar cada minuto
                 
             except Exception as e:
                 logger.error(f"Error en monitoreo de alertas: {e}")
                 await asyncio.sleep(30)
     
+    async def request_check(self):
+        """Solicitar una pasada de chequeo de alertas (coalescida)
+
+        Si ya hay una pasada en curso, los solicitantes se suman a ella y
+        reciben su resultado; los componentes upstream se consultan una vez.
+        """
+        if self._check_task is None or self._check_task.done():
+            self._check_task = asyncio.create_task(self._check_simulated_alerts())
+        await asyncio.shield(self._check_task)
+
     async def _check_simulated_alerts(self):
         """Generar alertas simuladas para demostración"""
-        from app.core.solar_monitor import SolarMonitor
-        from app.core.social_analyzer import SocialAnalyzer
-        
         # Alertas solares simuladas
-        if len(self.active_alerts) < 2:  # Limitar número de alertas activas
+        if len(self._active_by_key) < 2:  # Limitar número de alertas activas
             solar_alert = self._create_solar_alert()
             if solar_alert:
                 self.add_alert(solar_alert)
@@ -94,7 +147,7 @@ class AlertSystem:
     
     def _create_solar_alert(self):
         """Crear alerta solar de ejemplo"""
-        if len([a for a in self.active_alerts if a.type == AlertType.SOLAR]) == 0:
+        if self._type_counts[AlertType.SOLAR] == 0:
             return Alert(
                 id=self._get_next_alert_id(),
                 level=AlertLevel.WARNING,
@@ -109,7 +162,7 @@ class AlertSystem:
     
     def _create_social_alert(self):
         """Crear alerta social de ejemplo"""
-        if len([a for a in self.active_alerts if a.type == AlertType.SOCIAL]) == 0:
+        if self._type_counts[AlertType.SOCIAL] == 0:
             return Alert(
                 id=self._get_next_alert_id(),
                 level=AlertLevel.INFO,
@@ -122,19 +175,38 @@ class AlertSystem:
             )
         return None
     
+    @property
+    def active_alerts(self) -> List[Alert]:
+        """Vista de las alertas activas no expiradas"""
+        self._prune_expired()
+        return list(self._active_by_key.values())
+
+    def _prune_expired(self):
+        """Retirar alertas vencidas del índice (O(k) con k = expiradas)"""
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, _, key = heapq.heappop(self._expiry_heap)
+            alert = self._active_by_key.get(key)
+            if alert is not None and alert.expires_at <= now:
+                del self._active_by_key[key]
+                self._type_counts[alert.type] -= 1
+                self._serialized_cache = None
+
     def add_alert(self, alert: Alert):
         """Añadir una nueva alerta al sistema"""
-        # Verificar si ya existe una alerta similar
-        similar_alerts = [
-            a for a in self.active_alerts 
-            if a.type == alert.type and a.title == alert.title
-        ]
-        
-        if not similar_alerts:
-            self.active_alerts.append(alert)
+        # Verificar si ya existe una alerta similar (lookup O(1) en el índice)
+        key = (alert.type, alert.title)
+        if key not in self._active_by_key:
+            alert.created_ts = alert.timestamp.replace(tzinfo=timezone.utc).timestamp()
+            alert.expires_at = alert.created_ts + alert.duration_hours * 3600
+            alert.timestamp_iso = alert.timestamp.isoformat()
+            self._active_by_key[key] = alert
+            self._type_counts[alert.type] += 1
+            heapq.heappush(self._expiry_heap, (alert.expires_at, alert.id, key))
+            self._serialized_cache = None
             self.alert_history.append(alert)
             logger.info(f"🚨 Nueva alerta: {alert.title} (Nivel: {alert.level.value})")
-            
+
             # Notificación (en un sistema real, aquí irían webhooks, emails, etc.)
             self._notify_alert(alert)
     
@@ -162,55 +234,50 @@ class AlertSystem:
     
     def _get_required_action(self, alert: Alert) -> str:
         """Obtener acción requerida basada en el tipo de alerta"""
-        actions = {
-            AlertType.SOLAR: "Monitorear actividad solar y posibles efectos en sistemas biológicos",
-            AlertType.SOCIAL: "Analizar tendencias sociales y preparar respuestas estratégicas", 
-            AlertType.CORRELATION: "Evaluar impacto en resonancia solar-social y predicciones",
-            AlertType.SYSTEM: "Revisar estado del sistema y componentes afectados"
-        }
-        return actions.get(alert.type, "Monitorizar situación")
+        return _ACTIONS.get(alert.type, "Monitorizar situación")
     
     def acknowledge_alert(self, alert_id: int) -> bool:
         """Reconocer una alerta activa"""
-        for alert in self.active_alerts:
+        for alert in self._active_by_key.values():
             if alert.id == alert_id:
                 alert.acknowledged = True
+                self._serialized_cache = None
                 logger.info(f"✅ Alerta {alert_id} reconocida: {alert.title}")
                 return True
         return False
     
     def get_active_alerts(self) -> List[Dict[str, Any]]:
         """Obtener alertas activas en formato serializable"""
-        now = datetime.utcnow()
-        
-        # Limpiar alertas expiradas
-        self.active_alerts = [
-            alert for alert in self.active_alerts
-            if now - alert.timestamp < timedelta(hours=alert.duration_hours)
-        ]
-        
-        return [
+        now = time.time()
+        if self._serialized_cache is not None and now < self._cache_valid_until:
+            return self._serialized_cache
+
+        # Limpiar alertas expiradas y reconstruir el payload
+        self._prune_expired()
+        self._serialized_cache = [
             {
                 "id": alert.id,
                 "level": alert.level.value,
                 "type": alert.type.value,
                 "title": alert.title,
                 "message": alert.message,
-                "timestamp": alert.timestamp.isoformat(),
+                "timestamp": alert.timestamp_iso,
                 "duration_hours": alert.duration_hours,
                 "acknowledged": alert.acknowledged,
                 "data": alert.data or {}
             }
-            for alert in self.active_alerts
+            for alert in self._active_by_key.values()
         ]
+        self._cache_valid_until = min(
+            (alert.expires_at for alert in self._active_by_key.values()),
+            default=float('inf')
+        )
+        return self._serialized_cache
     
     def get_24h_stats(self) -> int:
         """Obtener estadísticas de alertas en las últimas 24 horas"""
-        cutoff = datetime.utcnow() - timedelta(hours=24)
-        return len([
-            alert for alert in self.alert_history
-            if alert.timestamp > cutoff
-        ])
+        cutoff = time.time() - 86400
+        return sum(1 for alert in self.alert_history if alert.created_ts > cutoff)
     
     def _get_next_alert_id(self) -> int:
         """Obtener siguiente ID de alerta"""
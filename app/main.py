@@ -3,35 +3,114 @@
 Versión compatible con Pydantic v2 y sin dependencias problemáticas
 """
 import asyncio
-from datetime import datetime, timedelta
+import bisect
+import itertools
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from functools import wraps
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 import random
 import logging
 
+import numpy as np
+
+from app.ml_models.crispation_predictor import CrispationPredictor
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("helio_bio_social")
 
-# Datos globales del sistema
-historical_data = []
+# Datos globales del sistema (ring buffer: append O(1) y desalojo automático,
+# sin el memmove de list.pop(0) en cada tick)
+historical_data = deque(maxlen=100)
+# Marcas epoch paralelas a historical_data: permiten cortar por antigüedad
+# con bisect en vez de reparsear los timestamps ISO en cada lectura
+historical_ts = deque(maxlen=100)
+# Último tick publicado por swap atómico de dict: los endpoints GET lo leen
+# sin condicionales ni llamadas async de respaldo (el lifespan espera al
+# primer update antes de servir tráfico)
+latest_snapshot = {}
 active_alerts = []
 next_alert_id = 0
 
+# Señal de refresco bajo demanda (se crea perezosamente dentro del event loop)
+_refresh_event = None
+
+class _TTLCache:
+    """Caché TTL en memoria para respuestas GET de solo lectura
+
+    Los datos solo cambian en cada tick de actualización, así que servir
+    la misma respuesta durante medio ciclo (15 s) elimina el recomputado
+    y la reserialización por petición bajo tráfico de dashboards.
+    """
+
+    def __init__(self, ttl: float = 15.0):
+        self.ttl = ttl
+        self._store = {}
+
+    def get(self, key):
+        entry = self._store.get(key)
+        if entry is not None and time.time() < entry[0]:
+            return entry[1]
+        return None
+
+    def set(self, key, value):
+        self._store[key] = (time.time() + self.ttl, value)
+
+    def clear(self):
+        self._store.clear()
+
+_response_cache = _TTLCache(ttl=15.0)
+
+def cached_response(func):
+    """Cachear la respuesta de un endpoint GET hasta el próximo tick/TTL"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = (func.__name__, tuple(sorted(kwargs.items())))
+        hit = _response_cache.get(key)
+        if hit is not None:
+            return hit
+        result = await func(*args, **kwargs)
+        _response_cache.set(key, result)
+        return result
+    return wrapper
+
+def request_refresh():
+    """Despertar el bucle de actualización inmediatamente"""
+    if _refresh_event is not None:
+        _refresh_event.set()
+
+def _maybe_request_refresh(max_age_seconds: float = 10.0):
+    """Pedir un refresco si el último punto histórico está viejo"""
+    if historical_ts and time.time() - historical_ts[-1] > max_age_seconds:
+        request_refresh()
+
 class AlertSystem:
     """Sistema de alertas simplificado"""
     
     def __init__(self):
         self.active_alerts = []
         self.alert_history = []
+        # Claves (tipo, nivel) de las alertas activas: dedup O(1) en lugar de
+        # comparar dicts completos contra toda la lista en cada tick
+        self._active_keys = set()
     
-    async def analyze_conditions(self, solar_data, social_data, resonance):
+    async def analyze_conditions(self, solar_data, social_data, resonance, now=None):
         """Analizar condiciones para generar alertas"""
+        # Un solo timestamp lógico por pasada: todas las alertas del tick lo
+        # comparten en lugar de pagar una lectura de reloj por alerta
+        if now is None:
+            now = datetime.utcnow()
+        # Marcas epoch precalculadas: los filtros de expiración comparan
+        # floats en vez de construir timedeltas por alerta
+        now_ts = now.replace(tzinfo=timezone.utc).timestamp()
         new_alerts = []
-        
+
         # Alerta por alta actividad solar
         if solar_data.get('sunspot_number', 0) > 80:
             new_alerts.append({
@@ -39,7 +118,9 @@ class AlertSystem:
                 'type': 'SOLAR',
                 'title': '🌞 ALTA ACTIVIDAD SOLAR',
                 'message': f"Manchas solares en {solar_data['sunspot_number']}. Influencia elevada en psique colectiva.",
-                'timestamp': datetime.utcnow(),
+                'timestamp': now,
+                'timestamp_ts': now_ts,
+                'expires_at': now_ts + 6 * 3600,
                 'duration_hours': 6
             })
         
@@ -50,7 +131,9 @@ class AlertSystem:
                 'type': 'CORRELATION',
                 'title': '🔗 RESONANCIA CRÍTICA',
                 'message': f"Resonancia solar-social en {resonance:.1%}. Condiciones para eventos sociales significativos.",
-                'timestamp': datetime.utcnow(),
+                'timestamp': now,
+                'timestamp_ts': now_ts,
+                'expires_at': now_ts + 12 * 3600,
                 'duration_hours': 12
             })
         
@@ -61,7 +144,9 @@ class AlertSystem:
                 'type': 'SOCIAL', 
                 'title': '👥 TENSIÓN SOCIAL ELEVADA',
                 'message': f"Conflicto social en {social_data['conflict_metric']:.1%}. Crispación detectable.",
-                'timestamp': datetime.utcnow(),
+                'timestamp': now,
+                'timestamp_ts': now_ts,
+                'expires_at': now_ts + 4 * 3600,
                 'duration_hours': 4
             })
         
@@ -69,29 +154,49 @@ class AlertSystem:
     
     async def get_active_alerts(self):
         """Obtener alertas activas"""
-        now = datetime.utcnow()
-        # Filtrar alertas expiradas
+        now_ts = time.time()
+        # Filtrar alertas expiradas (una comparación de floats por alerta)
         self.active_alerts = [
             alert for alert in self.active_alerts
-            if now - alert['timestamp'] < timedelta(hours=alert['duration_hours'])
+            if alert['expires_at'] > now_ts
         ]
+        # Reconstruir las claves de dedup para soltar las de alertas vencidas
+        self._active_keys = {(a['type'], a['level']) for a in self.active_alerts}
         return self.active_alerts
     
     async def get_alert_stats(self):
         """Obtener estadísticas de alertas"""
-        now = datetime.utcnow()
-        alerts_24h = len([
-            alert for alert in self.alert_history
-            if now - alert['timestamp'] < timedelta(hours=24)
-        ])
-        
+        now_ts = time.time()
+        cutoff = now_ts - 24 * 3600
+        alerts_24h = sum(
+            1 for alert in self.alert_history if alert['timestamp_ts'] > cutoff
+        )
+
+        # Una sola pasada sobre las activas: descarta vencidas y acumula los
+        # contadores, en lugar de cuatro comprehensions sobre la misma lista
+        critical = warning = solar = social = 0
+        still_active = []
+        for alert in self.active_alerts:
+            if alert['expires_at'] <= now_ts:
+                continue
+            still_active.append(alert)
+            level = alert['level']
+            alert_type = alert['type']
+            critical += level == 'CRITICAL'
+            warning += level == 'WARNING'
+            solar += alert_type == 'SOLAR'
+            social += alert_type == 'SOCIAL'
+        if len(still_active) != len(self.active_alerts):
+            self.active_alerts = still_active
+            self._active_keys = {(a['type'], a['level']) for a in still_active}
+
         return {
-            "active_alerts": len(self.active_alerts),
+            "active_alerts": len(still_active),
             "alerts_24h": alerts_24h,
-            "critical_alerts": len([a for a in self.active_alerts if a['level'] == 'CRITICAL']),
-            "warning_alerts": len([a for a in self.active_alerts if a['level'] == 'WARNING']),
-            "solar_alerts": len([a for a in self.active_alerts if a['type'] == 'SOLAR']),
-            "social_alerts": len([a for a in self.active_alerts if a['type'] == 'SOCIAL'])
+            "critical_alerts": critical,
+            "warning_alerts": warning,
+            "solar_alerts": solar,
+            "social_alerts": social
         }
     
     async def acknowledge_alert(self, alert_id: int):
@@ -146,6 +251,7 @@ class SocialAnalyzerService:
 solar_service = SolarService()
 social_service = SocialAnalyzerService()
 alert_system = AlertSystem()
+crispation_predictor = CrispationPredictor()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -158,6 +264,9 @@ async def lifespan(app: FastAPI):
     try:
         # Inicializar con datos
         await update_system_data()
+        # Entrenar el modelo en un hilo aparte: la primera petición ya
+        # encuentra una instancia caliente y el event loop no se bloquea
+        await asyncio.to_thread(crispation_predictor.train_model)
         # Iniciar actualización continua
         asyncio.create_task(continuous_data_update())
         
@@ -174,35 +283,72 @@ async def update_system_data():
     """Actualizar datos del sistema"""
     global historical_data
     
+    now = datetime.utcnow()
     solar_data = await solar_service.get_current_solar_data()
     social_data = await social_service.get_social_analysis()
     resonance = calculate_resonance(solar_data, social_data)
-    
-    # Generar alertas
-    new_alerts = await alert_system.analyze_conditions(solar_data, social_data, resonance)
+
+    # Precalcular las interpretaciones del tick: son funciones puras de estos
+    # datos, así que los endpoints las devuelven sin recomputar por petición
+    solar_data['interpretation'] = get_solar_interpretation(solar_data)
+    social_data['mood'] = get_social_mood(social_data)
+
+    # Generar alertas (comparten el timestamp del tick)
+    new_alerts = await alert_system.analyze_conditions(
+        solar_data, social_data, resonance, now=now
+    )
     for alert in new_alerts:
-        if alert not in alert_system.active_alerts:
+        key = (alert['type'], alert['level'])
+        if key not in alert_system._active_keys:
+            alert_system._active_keys.add(key)
             alert_system.active_alerts.append(alert)
             alert_system.alert_history.append(alert)
     
     # Guardar histórico
+    # orjson serializa el datetime directamente; el epoch float evita
+    # cualquier reparse en los filtros de lectura
+    now_epoch = now.replace(tzinfo=timezone.utc).timestamp()
     historical_point = {
-        'timestamp': datetime.utcnow().isoformat(),
+        'timestamp': now,
+        'ts_epoch': now_epoch,
         'solar': solar_data,
         'social': social_data,
         'resonance': resonance,
+        'alert_message': get_alert_message(resonance),
         'alerts_triggered': len(new_alerts)
     }
     
     historical_data.append(historical_point)
-    if len(historical_data) > 100:
-        historical_data.pop(0)
+    historical_ts.append(now_epoch)
+
+    # Publicar el snapshot del tick (la asignación de dict es atómica)
+    global latest_snapshot
+    latest_snapshot = {
+        'solar': solar_data,
+        'social': social_data,
+        'resonance': resonance,
+        'alert_message': historical_point['alert_message']
+    }
+
+    # Invalidar respuestas cacheadas: hay datos nuevos
+    _response_cache.clear()
 
 async def continuous_data_update():
-    """Actualización continua cada 30 segundos"""
+    """Actualización continua: cada 30 segundos o al instante bajo demanda
+
+    En lugar de un sleep fijo, el bucle espera sobre un Event con techo de
+    30 s: sin demanda se comporta igual que antes, pero request_refresh()
+    lo despierta inmediatamente cuando un endpoint observa datos viejos.
+    """
+    global _refresh_event
+    _refresh_event = asyncio.Event()
     while True:
+        try:
+            await asyncio.wait_for(_refresh_event.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            pass
+        _refresh_event.clear()
         await update_system_data()
-        await asyncio.sleep(30)
 
 def calculate_resonance(solar, social):
     """Calcular resonancia solar-social"""
@@ -218,7 +364,9 @@ app = FastAPI(
     title="HelioBio-Social API",
     description="Sistema de Análisis Heliobiológico con Alertas Inteligentes",
     version="1.3.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson serializa datetimes/enums en C, 3-5x más rápido que json stdlib
+    default_response_class=ORJSONResponse
 )
 
 # Configuración de middleware y archivos estáticos
@@ -256,32 +404,36 @@ async def health_check():
     }
 
 @app.get("/api/solar/current")
+@cached_response
 async def get_current_solar_activity():
     """Actividad solar actual"""
-    solar_data = historical_data[-1]['solar'] if historical_data else await solar_service.get_current_solar_data()
-    
+    _maybe_request_refresh()
+    solar_data = latest_snapshot['solar']
+
     return {
         "solar_activity": solar_data,
-        "chizhevsky_interpretation": get_solar_interpretation(solar_data),
+        "chizhevsky_interpretation": solar_data['interpretation'],
         "data_source": "enhanced_simulation"
     }
 
 @app.get("/api/social/analysis")
+@cached_response
 async def get_social_analysis():
     """Análisis social actual"""
-    social_data = historical_data[-1]['social'] if historical_data else await social_service.get_social_analysis()
-    
+    social_data = latest_snapshot['social']
+
     return {
         "social_analysis": social_data,
-        "collective_mood": get_social_mood(social_data),
+        "collective_mood": social_data['mood'],
         "data_source": "enhanced_social_analysis"
     }
 
 @app.get("/api/social/trending")
+@cached_response
 async def get_trending_topics():
     """Temas trending"""
-    social_data = historical_data[-1]['social'] if historical_data else await social_service.get_social_analysis()
-    
+    social_data = latest_snapshot['social']
+
     return {
         "trending_topics": social_data.get('trending_topics', []),
         "dominant_emotion": social_data.get('dominant_emotion', 'neutral'),
@@ -289,13 +441,16 @@ async def get_trending_topics():
     }
 
 @app.get("/api/correlation/realtime")
+@cached_response
 async def get_realtime_correlation():
     """Correlación en tiempo real"""
-    if not historical_data:
+    _maybe_request_refresh()
+    latest = latest_snapshot
+    if not latest:
         raise HTTPException(status_code=503, detail="Sistema inicializando...")
-    
-    resonance = historical_data[-1]['resonance']
-    solar_data = historical_data[-1]['solar']
+
+    resonance = latest['resonance']
+    solar_data = latest['solar']
     
     interpretation = "ALTA RESONANCIA" if resonance > 0.7 else "RESONANCIA MODERADA" if resonance > 0.4 else "RESONANCIA BAJA"
     
@@ -308,7 +463,7 @@ async def get_realtime_correlation():
         },
         "crispation_alert": {
             "level": "HIGH" if resonance > 0.7 else "MODERATE" if resonance > 0.5 else "LOW",
-            "message": get_alert_message(resonance)
+            "message": latest['alert_message']
         },
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -326,7 +481,8 @@ async def get_active_alerts():
                 "type": alert["type"],
                 "title": alert["title"],
                 "message": alert["message"],
-                "timestamp": alert["timestamp"].isoformat(),
+                # orjson serializa datetime nativamente, sin isoformat() manual
+                "timestamp": alert["timestamp"],
                 "duration_hours": alert["duration_hours"],
                 "data": {}
             }
@@ -337,6 +493,7 @@ async def get_active_alerts():
     }
 
 @app.get("/api/alerts/stats")
+@cached_response
 async def get_alert_stats():
     """Estadísticas de alertas"""
     return await alert_system.get_alert_stats()
@@ -348,21 +505,63 @@ async def acknowledge_alert(alert_id: int):
     return {"status": "acknowledged", "alert_id": alert_id}
 
 @app.get("/api/historical/data")
-async def get_historical_data(hours: int = 6):
-    """Datos históricos"""
+@cached_response
+async def get_historical_data(hours: int = 6, max_buckets: int = 50):
+    """Datos históricos, agregados server-side a lo sumo en max_buckets"""
     if not historical_data:
-        return {"time_range_hours": hours, "data_points": 0, "data": []}
-    
-    cutoff_time = datetime.utcnow().timestamp() - (hours * 3600)
-    filtered_data = [
-        point for point in historical_data 
-        if datetime.fromisoformat(point['timestamp']).timestamp() > cutoff_time
-    ]
-    
+        return {"time_range_hours": hours, "data_points": 0,
+                "downsampled": False, "data": []}
+
+    # Corte por antigüedad con bisect sobre las marcas epoch ordenadas:
+    # O(log N) y sin reparsear ISO8601 por punto
+    cutoff_time = time.time() - (hours * 3600)
+    ts_list = list(historical_ts)
+    start = bisect.bisect_right(ts_list, cutoff_time)
+    window = list(itertools.islice(historical_data, start, None))
+    data_points = len(window)
+
+    if data_points <= max_buckets:
+        return {
+            "time_range_hours": hours,
+            "data_points": data_points,
+            "downsampled": False,
+            "data": window
+        }
+
+    # Más puntos que buckets: reducir a min/max/avg por bucket temporal.
+    # El payload queda acotado por max_buckets aunque la ventana crezca
+    resonance = np.fromiter(
+        (p['resonance'] for p in window), dtype=np.float64, count=data_points)
+    sunspots = np.fromiter(
+        (p['solar']['sunspot_number'] for p in window),
+        dtype=np.float64, count=data_points)
+    conflict = np.fromiter(
+        (p['social']['conflict_metric'] for p in window),
+        dtype=np.float64, count=data_points)
+    alerts = np.fromiter(
+        (p['alerts_triggered'] for p in window),
+        dtype=np.int64, count=data_points)
+
+    data = []
+    for idx in np.array_split(np.arange(data_points), max_buckets):
+        if idx.size == 0:
+            continue
+        bucket_res = resonance[idx]
+        data.append({
+            "t": window[idx[-1]]['timestamp'],
+            "resonance_min": float(bucket_res.min()),
+            "resonance_max": float(bucket_res.max()),
+            "resonance_avg": float(bucket_res.mean()),
+            "sunspot_avg": float(sunspots[idx].mean()),
+            "conflict_avg": float(conflict[idx].mean()),
+            "alerts_triggered_sum": int(alerts[idx].sum())
+        })
+
     return {
         "time_range_hours": hours,
-        "data_points": len(filtered_data),
-        "data": filtered_data[-50:]  # Últimos 50 puntos
+        "data_points": data_points,
+        "downsampled": True,
+        "data": data
     }
 
 # Funciones auxiliares
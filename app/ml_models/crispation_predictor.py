@@ -2,10 +2,12 @@
 🤖 MODELO PREDICTIVO DE CRISPACIÓN SOCIAL
 Machine Learning para predecir conflictividad basada en patrones solares
 """
+import asyncio
+from functools import lru_cache
 import numpy as np
-import pandas as pd
 import joblib
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
 import logging
@@ -20,101 +22,136 @@ class CrispationPredictor:
     def __init__(self):
         self.model = None
         self.is_trained = False
+        self._feature_importances = None
+        self._top_factors = None
         self.feature_names = [
             'sunspot_number', 'solar_flux', 'flare_activity', 
             'geomagnetic_storm', 'solar_wind_speed', 'day_of_year',
             'solar_cycle_progress', 'month_sin', 'month_cos'
         ]
         
+    # Bins de nivel discreto por manchas solares: (umbral, niveles, cortes
+    # acumulados del draw uniforme). Congelados a nivel de clase para que el
+    # muestreo vectorizado no reconstruya arrays por llamada
+    _FLARE_BINS = (
+        (120, np.array([3, 4, 5]), np.array([0.3, 0.7])),
+        (80, np.array([2, 3, 4]), np.array([0.4, 0.8])),
+        (40, np.array([1, 2, 3]), np.array([0.5, 0.9])),
+        (-np.inf, np.array([0, 1, 1]), np.array([0.7, 1.0])),
+    )
+    _STORM_BINS = (
+        (100, np.array([2, 3, 4]), np.array([0.4, 0.8])),
+        (60, np.array([1, 2, 3]), np.array([0.5, 0.9])),
+        (-np.inf, np.array([0, 1, 1]), np.array([0.8, 1.0])),
+    )
+
+    @staticmethod
+    def _sample_levels(sunspots, draws, bins):
+        """Muestrear niveles discretos por bin de manchas (vectorizado)"""
+        out = np.zeros(sunspots.shape, dtype=np.int64)
+        assigned = np.zeros(sunspots.shape, dtype=bool)
+        for threshold, values, cuts in bins:
+            mask = ~assigned & (sunspots > threshold)
+            out[mask] = values[np.searchsorted(cuts, draws[mask], side='right')]
+            assigned |= mask
+        return out
+
     def generate_training_data(self, num_samples=1000):
-        """Generar datos de entrenamiento sintéticos basados en patrones reales"""
+        """Generar datos de entrenamiento sintéticos basados en patrones reales
+
+        Devuelve (X, y) como ndarrays float32, con las columnas de X en el
+        orden de feature_names; no hace falta pandas para una matriz fija.
+        """
         logger.info("🧠 Generando datos de entrenamiento para modelo predictivo...")
-        
-        data = []
-        for i in range(num_samples):
-            # Patrones basados en investigación de Chizhevsky
-            solar_cycle_progress = random.uniform(0, 1)
-            
-            # Manchas solares siguen ciclo de 11 años
-            base_sunspots = 20 + (solar_cycle_progress * 130)  # 20-150
-            sunspots = max(0, base_sunspots + random.normalvariate(0, 15))
-            
-            # Otras métricas solares correlacionadas
-            solar_flux = 70 + (sunspots / 2) + random.normalvariate(0, 5)
-            flare_activity = self._flare_from_sunspots(sunspots)
-            geomagnetic_storm = self._storm_from_sunspots(sunspots)
-            solar_wind = 400 + random.normalvariate(0, 50)
-            
-            # Variables temporales
-            day_of_year = random.randint(1, 365)
-            month = (day_of_year // 30) % 12
-            month_sin = np.sin(2 * np.pi * month / 12)
-            month_cos = np.cos(2 * np.pi * month / 12)
-            
-            # Target: crispación social (0-1)
-            # Basado en teoría de Chizhevsky: máxima actividad solar → máxima conflictividad
-            base_crispation = solar_cycle_progress * 0.6  # Ciclo solar contribuye 60%
-            flare_effect = flare_activity * 0.08  # Fulguraciones contribuyen
-            geomagnetic_effect = geomagnetic_storm * 0.06  # Tormentas geomagnéticas
-            seasonal_effect = abs(month_sin) * 0.2  # Estacionalidad
-            noise = random.normalvariate(0, 0.1)
-            
-            crispation = (
-                base_crispation + 
-                flare_effect + 
-                geomagnetic_effect + 
-                seasonal_effect + 
-                noise
-            )
-            crispation = max(0, min(1, crispation))  # Normalizar 0-1
-            
-            data.append({
-                'sunspot_number': sunspots,
-                'solar_flux': solar_flux,
-                'flare_activity': flare_activity,
-                'geomagnetic_storm': geomagnetic_storm,
-                'solar_wind_speed': solar_wind,
-                'day_of_year': day_of_year,
-                'solar_cycle_progress': solar_cycle_progress,
-                'month_sin': month_sin,
-                'month_cos': month_cos,
-                'crispation': crispation
-            })
-        
-        return pd.DataFrame(data)
+
+        # Generación columna a columna en numpy: el overhead por muestra del
+        # intérprete desaparece y los num_samples se producen en una pasada
+        rng = np.random.default_rng(42)
+
+        # Patrones basados en investigación de Chizhevsky
+        solar_cycle_progress = rng.uniform(0, 1, num_samples)
+
+        # Manchas solares siguen ciclo de 11 años (20-150)
+        sunspots = np.clip(
+            20 + solar_cycle_progress * 130 + rng.normal(0, 15, num_samples), 0, None
+        )
+
+        # Otras métricas solares correlacionadas
+        solar_flux = 70 + sunspots / 2 + rng.normal(0, 5, num_samples)
+        flare_activity = self._sample_levels(sunspots, rng.random(num_samples), self._FLARE_BINS)
+        geomagnetic_storm = self._sample_levels(sunspots, rng.random(num_samples), self._STORM_BINS)
+        solar_wind = 400 + rng.normal(0, 50, num_samples)
+
+        # Variables temporales
+        day_of_year = rng.integers(1, 366, num_samples)
+        month = (day_of_year // 30) % 12
+        month_sin = np.sin(2 * np.pi * month / 12)
+        month_cos = np.cos(2 * np.pi * month / 12)
+
+        # Target: crispación social (0-1)
+        # Basado en teoría de Chizhevsky: máxima actividad solar → máxima conflictividad
+        crispation = np.clip(
+            solar_cycle_progress * 0.6       # Ciclo solar contribuye 60%
+            + flare_activity * 0.08          # Fulguraciones contribuyen
+            + geomagnetic_storm * 0.06       # Tormentas geomagnéticas
+            + np.abs(month_sin) * 0.2        # Estacionalidad
+            + rng.normal(0, 0.1, num_samples),
+            0, 1
+        )
+
+        X = np.column_stack([
+            sunspots,
+            solar_flux,
+            flare_activity,
+            geomagnetic_storm,
+            solar_wind,
+            day_of_year,
+            solar_cycle_progress,
+            month_sin,
+            month_cos
+        ]).astype(np.float32)
+        return X, crispation.astype(np.float32)
     
-    def train_model(self, df=None):
-        """Entrenar modelo Random Forest"""
+    def train_model(self, X=None, y=None):
+        """Entrenar modelo de gradient boosting por histogramas"""
         logger.info("🎯 Entrenando modelo predictivo de crispación...")
-        
-        if df is None:
-            df = self.generate_training_data(2000)
-        
-        # Preparar características y target
-        X = df[self.feature_names]
-        y = df['crispation']
+
+        if X is None:
+            X, y = self.generate_training_data(2000)
         
         # Dividir datos
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42
         )
         
-        # Entrenar modelo
-        self.model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
-            min_samples_split=5,
-            random_state=42,
-            n_jobs=-1
+        # Entrenar modelo: splits por histograma y árboles compactos, mucho
+        # más rápido que el Random Forest anterior tanto en fit como en predict
+        self.model = HistGradientBoostingRegressor(
+            max_iter=200,
+            max_depth=8,
+            learning_rate=0.05,
+            random_state=42
         )
-        
+
         self.model.fit(X_train, y_train)
-        
+
         # Evaluar modelo
         y_pred = self.model.predict(X_test)
         mae = mean_absolute_error(y_test, y_pred)
         r2 = r2_score(y_test, y_pred)
-        
+
+        # Importancias por permutación sobre el split de test (el modelo por
+        # histogramas no expone feature_importances_); se calculan una vez aquí
+        perm = permutation_importance(
+            self.model, X_test, y_test, n_repeats=5, random_state=42
+        )
+        self._feature_importances = dict(
+            zip(self.feature_names, perm.importances_mean)
+        )
+        self._top_factors = self._format_top_factors()
+        # Las predicciones memoizadas corresponden al modelo anterior
+        self._predict_cached.cache_clear()
+
         self.is_trained = True
         
         logger.info(f"✅ Modelo entrenado - MAE: {mae:.4f}, R²: {r2:.4f}")
@@ -130,9 +167,12 @@ class CrispationPredictor:
         
         # Preparar características para predicción
         features = self._prepare_features(solar_data, current_date)
-        
-        # Hacer predicción
-        crispation_prob = self.model.predict([features])[0]
+
+        # Hacer predicción (memoizada por tupla de features cuantizada: con
+        # datos solares que cambian cada tick, las peticiones repetidas del
+        # dashboard se resuelven como lookup de dict)
+        key = tuple(round(x, 3) for x in features)
+        crispation_prob = self._predict_cached(key)
         crispation_prob = max(0, min(1, crispation_prob))  # Asegurar rango 0-1
         
         # Interpretar resultado
@@ -147,6 +187,45 @@ class CrispationPredictor:
             'timestamp': datetime.utcnow().isoformat()
         }
     
+    @lru_cache(maxsize=256)
+    def _predict_cached(self, key):
+        """Ejecutar el modelo para una tupla de features cuantizada
+
+        Se invalida con cache_clear() tras cada reentrenamiento. La fila se
+        construye como array local: con to_thread puede haber varios misses
+        concurrentes y un buffer compartido memoizaría resultados cruzados.
+        """
+        row = np.asarray(key, dtype=np.float32).reshape(1, -1)
+        return float(self.model.predict(row)[0])
+
+    async def predict_crispation_async(self, solar_data, current_date=None):
+        """Predecir sin bloquear el event loop
+
+        sklearn ocupa el hilo durante fit/predict; ejecutarlo vía to_thread
+        mantiene las corrutinas de FastAPI respondiendo aunque la primera
+        llamada dispare el entrenamiento completo.
+        """
+        return await asyncio.to_thread(
+            self.predict_crispation, solar_data, current_date
+        )
+
+    def predict_many(self, batch):
+        """Predecir crispación para un lote de escenarios en una sola pasada
+
+        batch: iterable de tuplas (solar_data, fecha). Apilar las filas y
+        llamar a predict una vez amortiza la validación de entrada de sklearn,
+        que domina el coste cuando se predice fila a fila.
+        """
+        if not self.is_trained:
+            self.train_model()
+
+        X = np.asarray(
+            [self._prepare_features(solar_data, current_date)
+             for solar_data, current_date in batch],
+            dtype=np.float32
+        )
+        return np.clip(self.model.predict(X), 0, 1)
+
     def _prepare_features(self, solar_data, current_date):
         """Preparar características para el modelo"""
         solar_cycle_progress = solar_data.get('solar_cycle_progress', 
@@ -199,41 +278,53 @@ class CrispationPredictor:
                 'message': '✅ PROBABILIDAD BAJA - Condiciones sociales estables'
             }
     
+    _FEATURE_LABELS = {
+        'sunspot_number': "Manchas solares",
+        'solar_cycle_progress': "Fase ciclo solar",
+        'flare_activity': "Fulguraciones",
+        'geomagnetic_storm': "Actividad geomagnética",
+        'month_sin': "Estacionalidad",
+        'month_cos': "Estacionalidad",
+    }
+
+    def _format_top_factors(self):
+        """Formatear los 3 factores más importantes del modelo entrenado"""
+        top_factors = sorted(
+            self._feature_importances.items(), key=lambda x: x[1], reverse=True
+        )[:3]
+        return [
+            f"{self._FEATURE_LABELS[feature]} ({importance:.1%})"
+            for feature, importance in top_factors
+            if feature in self._FEATURE_LABELS
+        ]
+
     def _get_feature_importance(self, features):
-        """Obtener factores que contribuyen a la predicción"""
-        if not hasattr(self.model, 'feature_importances_'):
+        """Obtener factores que contribuyen a la predicción
+
+        Las importancias no cambian entre entrenamientos, así que la lista
+        formateada se calcula una vez al final de train_model y aquí solo
+        se devuelve.
+        """
+        if not self._top_factors:
             return ["Modelo en entrenamiento"]
-        
-        importance_dict = dict(zip(self.feature_names, self.model.feature_importances_))
-        top_factors = sorted(importance_dict.items(), key=lambda x: x[1], reverse=True)[:3]
-        
-        factors = []
-        for feature, importance in top_factors:
-            if feature == 'sunspot_number':
-                factors.append(f"Manchas solares ({importance:.1%})")
-            elif feature == 'solar_cycle_progress':
-                factors.append(f"Fase ciclo solar ({importance:.1%})")
-            elif feature == 'flare_activity':
-                factors.append(f"Fulguraciones ({importance:.1%})")
-            elif feature == 'geomagnetic_storm':
-                factors.append(f"Actividad geomagnética ({importance:.1%})")
-            elif 'month' in feature:
-                factors.append(f"Estacionalidad ({importance:.1%})")
-        
-        return factors
+        return self._top_factors
     
+    # Un solo draw uniforme contra cortes acumulados inline: random.choices
+    # reconstruía los pesos acumulados y hacía bisect en cada llamada
     def _flare_from_sunspots(self, sunspots):
         """Calcular actividad de fulguraciones basada en manchas solares"""
-        if sunspots > 120: return random.choices([3,4,5], weights=[0.3,0.4,0.3])[0]
-        elif sunspots > 80: return random.choices([2,3,4], weights=[0.4,0.4,0.2])[0]
-        elif sunspots > 40: return random.choices([1,2,3], weights=[0.5,0.4,0.1])[0]
-        else: return random.choices([0,1], weights=[0.7,0.3])[0]
-    
+        r = random.random()
+        if sunspots > 120: return 3 if r < 0.3 else (4 if r < 0.7 else 5)
+        elif sunspots > 80: return 2 if r < 0.4 else (3 if r < 0.8 else 4)
+        elif sunspots > 40: return 1 if r < 0.5 else (2 if r < 0.9 else 3)
+        else: return 0 if r < 0.7 else 1
+
     def _storm_from_sunspots(self, sunspots):
         """Calcular actividad geomagnética basada en manchas solares"""
-        if sunspots > 100: return random.choices([2,3,4], weights=[0.4,0.4,0.2])[0]
-        elif sunspots > 60: return random.choices([1,2,3], weights=[0.5,0.4,0.1])[0]
-        else: return random.choices([0,1], weights=[0.8,0.2])[0]
+        r = random.random()
+        if sunspots > 100: return 2 if r < 0.4 else (3 if r < 0.8 else 4)
+        elif sunspots > 60: return 1 if r < 0.5 else (2 if r < 0.9 else 3)
+        else: return 0 if r < 0.8 else 1
     
     def save_model(self, filepath='app/ml_models/crispation_predictor.joblib'):
         """Guardar modelo entrenado"""
@@ -246,6 +337,10 @@ class CrispationPredictor:
         try:
             self.model = joblib.load(filepath)
             self.is_trained = True
+            # Un modelo cargado no trae importancias: invalidar las cachés
+            self._feature_importances = None
+            self._top_factors = None
+            self._predict_cached.cache_clear()
             logger.info(f"📂 Modelo cargado desde: {filepath}")
         except FileNotFoundError:
             logger.warning("Modelo no encontrado, entrenando nuevo modelo...")
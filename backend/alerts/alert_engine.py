@@ -3,6 +3,11 @@ Sistema de alertas inteligente para HelioBio-Social
 Monitoriza correlaciones y genera alertas cuando se detectan patrones significativos
 """
 import asyncio
+import heapq
+import threading
+import time
+from collections import deque
+from itertools import count, islice
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -10,14 +15,34 @@ from typing import Dict, List, Optional, Any, Callable
 from dataclasses import dataclass, field
 import logging
 from enum import Enum
+import html
 import json
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import requests
+import string
+import orjson
+import aiohttp
+
+from .rule_kernels import (
+    correlation_spike_mask,
+    high_risk_mask,
+    mental_health_spike_mask,
+)
 
 logger = logging.getLogger(__name__)
 
+# Niveles de tormenta que disparan alerta: frozenset congelado en import para
+# que la pertenencia sea un hash lookup y no una búsqueda lineal en lista
+_STORM_LEVELS = frozenset(('STRONG', 'SEVERE'))
+
+def _col(df: pd.DataFrame, name: str, default: float = 0.0) -> np.ndarray:
+    """Columna como ndarray, o el valor por defecto difundido si falta
+
+    Equivalente vectorizado de `data.get(name, default)` en las condiciones
+    escalares: las ventanas pueden llegar sin alguna columna opcional.
+    """
+    if name in df.columns:
+        return df[name].to_numpy()
+    return np.full(len(df), default)
+
 class AlertSeverity(Enum):
     """Niveles de severidad de alerta"""
     INFO = "INFO"
@@ -34,7 +59,44 @@ class AlertType(Enum):
     PREDICTION_ALERT = "PREDICTION_ALERT"
     SYSTEM_ALERT = "SYSTEM_ALERT"
 
-@dataclass
+# Mapas invariantes congelados en import: antes se reconstruían en cada
+# creación de alerta (cadena if/elif) y en cada notificación a Slack
+_EXPIRY = {
+    AlertSeverity.CRITICAL: timedelta(hours=1),
+    AlertSeverity.HIGH: timedelta(hours=6),
+    AlertSeverity.MODERATE: timedelta(days=1),
+}
+
+# Cabeceras del POST JSON a webhooks (orjson ya emite bytes)
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+def _json_default(obj):
+    """Serializar tipos que orjson no maneja de forma nativa (enums)"""
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+_SLACK_COLOR = {
+    AlertSeverity.CRITICAL: "#ff0000",
+    AlertSeverity.HIGH: "#ff6600",
+    AlertSeverity.MODERATE: "#ffcc00",
+    AlertSeverity.LOW: "#3366ff",
+    AlertSeverity.INFO: "#00cc00",
+}
+
+# Bloque CSS invariante del email de alerta, construido una sola vez en
+# import en lugar de realojarse en cada envío
+_EMAIL_CSS = """
+                    body { font-family: Arial, sans-serif; }
+                    .alert-critical { background-color: #ffcccc; border-left: 5px solid #ff0000; padding: 15px; }
+                    .alert-high { background-color: #ffe6cc; border-left: 5px solid #ff6600; padding: 15px; }
+                    .alert-moderate { background-color: #ffffcc; border-left: 5px solid #ffcc00; padding: 15px; }
+                    .data-table { border-collapse: collapse; width: 100%; margin-top: 20px; }
+                    .data-table th, .data-table td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+                    .data-table th { background-color: #f2f2f2; }
+"""
+
+@dataclass(slots=True)
 class Alert:
     """Estructura de una alerta"""
     id: str
@@ -48,7 +110,14 @@ class Alert:
     acknowledged_by: Optional[str] = None
     acknowledged_at: Optional[datetime] = None
     expires_at: Optional[datetime] = None
-    
+    # Expiración en segundos epoch (0.0 = sin expiración): la limpieza
+    # periódica compara floats en vez de objetos datetime
+    expires_ts: float = 0.0
+    # isoformat precalculado de los campos inmutables: to_dict se llama una
+    # vez por alerta y por petición HTTP, el formateo solo una vez por alerta
+    timestamp_iso: str = ""
+    expires_iso: Optional[str] = None
+
     def to_dict(self) -> Dict[str, Any]:
         """Convertir alerta a diccionario"""
         return {
@@ -57,20 +126,33 @@ class Alert:
             'severity': self.severity.value,
             'title': self.title,
             'message': self.message,
-            'timestamp': self.timestamp.isoformat(),
+            'timestamp': self.timestamp_iso or self.timestamp.isoformat(),
             'data': self.data,
             'acknowledged': self.acknowledged,
             'acknowledged_by': self.acknowledged_by,
             'acknowledged_at': self.acknowledged_at.isoformat() if self.acknowledged_at else None,
-            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+            'expires_at': self.expires_iso
         }
 
 class AlertRule:
     """Regla para generar alertas"""
-    
+
+    # Sin __dict__ por instancia: menos heap por regla y lecturas de
+    # atributo por offset en los contadores del camino caliente
+    __slots__ = ('name', 'condition', 'vcondition', 'alert_type', 'severity',
+                 'message_template', 'cooldown_minutes', '_cooldown',
+                 'applicable_sources', 'last_triggered', 'eval_count',
+                 'trigger_count', 'total_time_ns', '_parsed_template')
+
+    # Secuencia compartida para el sufijo del id de alerta: O(1) y
+    # monotónica, en lugar de serializar y hashear el dict de datos completo
+    _alert_seq = count()
+
     def __init__(self, name: str, condition: Callable[[Dict[str, Any]], bool],
                  alert_type: AlertType, severity: AlertSeverity,
-                 message_template: str, cooldown_minutes: int = 60):
+                 message_template: str, cooldown_minutes: int = 60,
+                 applicable_sources: Optional[set] = None,
+                 vcondition: Optional[Callable[[pd.DataFrame], np.ndarray]] = None):
         """
         Args:
             name: Nombre de la regla
@@ -79,23 +161,46 @@ class AlertRule:
             severity: Severidad
             message_template: Plantilla para mensaje
             cooldown_minutes: Tiempo mínimo entre alertas del mismo tipo
+            applicable_sources: Fuentes de datos a las que aplica la regla
+                (None = todas)
+            vcondition: Twin vectorizado de `condition` que recibe una ventana
+                (DataFrame) y devuelve una máscara booleana por fila; permite
+                evaluar lotes sin bucle Python (ver `evaluate_batch`)
         """
         self.name = name
         self.condition = condition
+        self.vcondition = vcondition
         self.alert_type = alert_type
         self.severity = severity
         self.message_template = message_template
+        # Plantilla preparseada una sola vez: renderizar recorre la lista de
+        # tokens en lugar de re-parsear el formato en cada alerta
+        self._parsed_template = tuple(string.Formatter().parse(message_template))
         self.cooldown_minutes = cooldown_minutes
+        # timedelta precalculado: el chequeo de cooldown por evaluación queda
+        # en una suma + comparación sin construir objetos
+        self._cooldown = timedelta(minutes=cooldown_minutes)
+        self.applicable_sources = (
+            frozenset(applicable_sources) if applicable_sources else None
+        )
         self.last_triggered = None
-    
+        # Contadores de perfil: el motor los usa para reordenar las reglas
+        # baratas y de alta tasa de disparo al frente de cada slice
+        self.eval_count = 0
+        self.trigger_count = 0
+        self.total_time_ns = 0
+
+    def in_cooldown(self) -> bool:
+        """¿Está la regla dentro de su ventana de cooldown?"""
+        return (self.last_triggered is not None
+                and datetime.now() < self.last_triggered + self._cooldown)
+
     def should_trigger(self, data: Dict[str, Any]) -> bool:
         """Determinar si la regla debe disparar una alerta"""
-        # Verificar cooldown
-        if self.last_triggered:
-            cooldown_end = self.last_triggered + timedelta(minutes=self.cooldown_minutes)
-            if datetime.now() < cooldown_end:
-                return False
-        
+        # Cooldown primero: es el descarte más barato y frecuente
+        if self.in_cooldown():
+            return False
+
         # Evaluar condición
         try:
             return self.condition(data)
@@ -105,153 +210,304 @@ class AlertRule:
     
     def create_alert(self, data: Dict[str, Any]) -> Alert:
         """Crear alerta a partir de datos"""
-        # Formatear mensaje
-        message = self.message_template.format(**data)
-        
+        # Una sola lectura de reloj por alerta: id, expiración, timestamp y
+        # last_triggered derivan todos del mismo instante
+        now = datetime.now()
+
+        # Formatear mensaje sobre la plantilla preparseada
+        message = "".join(
+            literal + (format(data[field], spec) if field is not None else "")
+            for literal, field, spec, _ in self._parsed_template
+        )
+
         # Crear ID único
-        alert_id = f"{self.alert_type.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hash(str(data)) % 10000:04d}"
-        
-        # Determinar expiración
-        expires_at = None
-        if self.severity == AlertSeverity.CRITICAL:
-            expires_at = datetime.now() + timedelta(hours=1)
-        elif self.severity == AlertSeverity.HIGH:
-            expires_at = datetime.now() + timedelta(hours=6)
-        elif self.severity == AlertSeverity.MODERATE:
-            expires_at = datetime.now() + timedelta(days=1)
-        
+        alert_id = f"{self.alert_type.value}_{now.strftime('%Y%m%d_%H%M%S')}_{next(self._alert_seq):04x}"
+
+        # Determinar expiración (lookup en el mapa precalculado)
+        ttl = _EXPIRY.get(self.severity)
+        expires_at = now + ttl if ttl is not None else None
+
         alert = Alert(
             id=alert_id,
             type=self.alert_type,
             severity=self.severity,
             title=f"Alerta {self.severity.value}: {self.alert_type.value}",
             message=message,
-            timestamp=datetime.now(),
+            timestamp=now,
             data=data,
-            expires_at=expires_at
+            expires_at=expires_at,
+            expires_ts=expires_at.timestamp() if expires_at else 0.0,
+            timestamp_iso=now.isoformat(),
+            expires_iso=expires_at.isoformat() if expires_at else None
         )
-        
+
         # Actualizar último disparo
-        self.last_triggered = datetime.now()
-        
+        self.last_triggered = now
+
         return alert
 
 class AlertEngine:
     """Motor principal de alertas"""
     
+    # Rotar la conexión SMTP tras este número de envíos para no agotar
+    # límites por conexión del servidor
+    _SMTP_MAX_SENDS = 100
+
+    # Cada cuántas evaluaciones de regla se reordenan los slices según el
+    # perfil acumulado (coste medio y tasa de disparo)
+    _REORDER_EVERY = 1024
+
+    # Tope del historial de alertas: append O(1) con desalojo automático
+    # en lugar de una lista que crece sin límite
+    _MAX_HISTORY = 10_000
+
     def __init__(self, notification_channels: List[str] = None):
         """Inicializar motor de alertas"""
         self.rules: List[AlertRule] = []
+        # Índice de reglas por fuente de datos: evaluate_data solo recorre
+        # las reglas que aplican a la fuente, no todas las registradas
+        self._rules_by_source: Dict[str, List[AlertRule]] = {}
+        self._wildcard_rules: List[AlertRule] = []
+        self._dispatch_cache: Dict[str, List[AlertRule]] = {}
+        self._evals_since_reorder = 0
         self.active_alerts: Dict[str, Alert] = {}
-        self.alert_history: List[Alert] = []
-        self.notification_channels = notification_channels or ['log']
-        
+        # Min-heap de expiraciones (expires_ts, alert_id): la limpieza solo
+        # toca las alertas realmente vencidas, no todas las activas
+        self._expiry_heap: List[tuple] = []
+        self.alert_history: deque = deque(maxlen=self._MAX_HISTORY)
+        # Ventana deslizante de las últimas 24h: get_stats deja de filtrar
+        # el historial completo en cada llamada
+        self._recent_24h: deque = deque()
+        # Tupla inmutable: la lista de canales no cambia tras construir el
+        # motor y así el despacho itera sobre una secuencia compacta
+        self.notification_channels = tuple(notification_channels or ('log',))
+
+        # Sesión SMTP persistente (perezosa): abrir TLS+AUTH por alerta
+        # cuesta ~2 RTTs; reutilizar la conexión los paga una sola vez.
+        # smtplib se importa en el primer envío (canal email no siempre activo)
+        self._smtp_conn: Optional["smtplib.SMTP"] = None
+        self._smtp_sends = 0
+        # smtplib no es thread-safe y el envío corre en hilos de to_thread:
+        # el RLock serializa todo uso de la conexión compartida (reentrante
+        # porque el envío cierra/reabre la sesión por dentro)
+        self._smtp_lock = threading.RLock()
+
+        # Sesión HTTP compartida (perezosa): keep-alive reutiliza la conexión
+        # TCP+TLS entre webhooks en lugar de un handshake por alerta
+        self._http: Optional[aiohttp.ClientSession] = None
+
+        # Mapa canal -> corrutina de envío: el despacho en
+        # _send_notifications queda en un lookup en vez de una cadena if/elif
+        self._channel_senders = {
+            'email': self._send_email_notification,
+            'webhook': self._send_webhook_notification,
+            'slack': self._send_slack_notification,
+        }
+
         # Registrar reglas por defecto
         self._register_default_rules()
-        
+
         logger.info("AlertEngine initialized with %d rules", len(self.rules))
+
+    def _get_smtp(self, smtp_config: Dict[str, Any]) -> "smtplib.SMTP":
+        """Obtener la sesión SMTP cacheada, verificada y reconectando si hace falta"""
+        import smtplib
+
+        with self._smtp_lock:
+            server = self._smtp_conn
+            if server is not None and self._smtp_sends < self._SMTP_MAX_SENDS:
+                try:
+                    # Health check barato antes de reutilizar la conexión
+                    server.noop()
+                    return server
+                except (smtplib.SMTPException, OSError):
+                    self._close_smtp()
+            elif server is not None:
+                self._close_smtp()
+
+            server = smtplib.SMTP(smtp_config['host'], smtp_config['port'], timeout=10)
+            server.starttls()
+            server.login(smtp_config['username'], smtp_config['password'])
+            self._smtp_conn = server
+            self._smtp_sends = 0
+            return server
+
+    def _close_smtp(self):
+        """Cerrar la sesión SMTP cacheada (tolerante a conexiones ya caídas)"""
+        import smtplib
+
+        with self._smtp_lock:
+            if self._smtp_conn is not None:
+                try:
+                    self._smtp_conn.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._smtp_conn = None
+                self._smtp_sends = 0
+
+    def _get_http(self) -> aiohttp.ClientSession:
+        """Obtener la sesión HTTP compartida, creándola en el primer uso"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._http
+
+    async def close(self):
+        """Liberar recursos de red del motor"""
+        self._close_smtp()
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
     
     def _register_default_rules(self):
         """Registrar reglas de alerta por defecto"""
         
+        # Predicados fusionados en una sola expresión con cortocircuito:
+        # cada campo se lee una vez y la evaluación aborta en el primer
+        # término que descarta
+
         # 1. Regla para tormentas geomagnéticas fuertes
         def strong_geomagnetic_storm(data: Dict[str, Any]) -> bool:
-            kp = data.get('kp_index', 0)
-            storm_level = data.get('storm_level', 'NONE')
-            return kp >= 6 or storm_level in ['STRONG', 'SEVERE']
-        
+            return (data.get('kp_index', 0) >= 6
+                    or data.get('storm_level', 'NONE') in _STORM_LEVELS)
+
+        def strong_geomagnetic_storm_v(df: pd.DataFrame) -> np.ndarray:
+            stormy = (df['storm_level'].isin(_STORM_LEVELS).to_numpy()
+                      if 'storm_level' in df.columns else False)
+            return (_col(df, 'kp_index') >= 6) | stormy
+
         self.register_rule(AlertRule(
             name="strong_geomagnetic_storm",
             condition=strong_geomagnetic_storm,
+            vcondition=strong_geomagnetic_storm_v,
             alert_type=AlertType.GEOMAGNETIC_STORM,
             severity=AlertSeverity.HIGH,
             message_template="Tormenta geomagnética fuerte detectada: Kp={kp_index}, Nivel={storm_level}. "
                            "Esperar posibles efectos en salud mental en 3-5 días.",
-            cooldown_minutes=360  # 6 horas
+            cooldown_minutes=360,  # 6 horas
+            applicable_sources={'solar'}
         ))
         
         # 2. Regla para pico de correlación
         def correlation_spike(data: Dict[str, Any]) -> bool:
-            correlation = data.get('correlation', 0)
-            p_value = data.get('p_value', 1)
-            window_size = data.get('window_size', 30)
-            
             # Correlación fuerte y significativa en ventana reciente
-            return (abs(correlation) > 0.6 and 
-                    p_value < 0.01 and 
-                    window_size >= 7)
-        
+            return (abs(data.get('correlation', 0)) > 0.6 and
+                    data.get('p_value', 1) < 0.01 and
+                    data.get('window_size', 30) >= 7)
+
+        def correlation_spike_v(df: pd.DataFrame) -> np.ndarray:
+            return correlation_spike_mask(
+                _col(df, 'correlation'),
+                _col(df, 'p_value', 1.0),
+                _col(df, 'window_size', 30.0),
+            )
+
         self.register_rule(AlertRule(
             name="correlation_spike",
             condition=correlation_spike,
+            vcondition=correlation_spike_v,
             alert_type=AlertType.CORRELATION_SPIKE,
             severity=AlertSeverity.MODERATE,
             message_template="Pico de correlación detectado: r={correlation:.3f}, p={p_value:.4f}. "
                            "Actividad solar correlacionada fuertemente con indicadores de salud mental.",
-            cooldown_minutes=120
+            cooldown_minutes=120,
+            applicable_sources={'correlation'}
         ))
         
         # 3. Regla para aumento en indicadores de salud mental
         def mental_health_spike(data: Dict[str, Any]) -> bool:
-            increase_percent = data.get('increase_percent', 0)
-            baseline = data.get('baseline', 0)
-            current = data.get('current', 0)
-            
             # Aumento del 25% o más sobre la línea base
-            return (increase_percent >= 25 and 
-                    current > baseline and 
+            baseline = data.get('baseline', 0)
+            return (data.get('increase_percent', 0) >= 25 and
+                    data.get('current', 0) > baseline and
                     baseline > 0)
-        
+
+        def mental_health_spike_v(df: pd.DataFrame) -> np.ndarray:
+            return mental_health_spike_mask(
+                _col(df, 'increase_percent'),
+                _col(df, 'current'),
+                _col(df, 'baseline'),
+            )
+
         self.register_rule(AlertRule(
             name="mental_health_spike",
             condition=mental_health_spike,
+            vcondition=mental_health_spike_v,
             alert_type=AlertType.MENTAL_HEALTH_SPIKE,
             severity=AlertSeverity.HIGH,
             message_template="Aumento significativo en indicadores de salud mental: "
                            "+{increase_percent:.0f}% sobre línea base. "
                            "Valor actual: {current:.1f}, Línea base: {baseline:.1f}.",
-            cooldown_minutes=180
+            cooldown_minutes=180,
+            applicable_sources={'mental_health'}
         ))
         
         # 4. Regla para predicción de riesgo alto
         def high_risk_prediction(data: Dict[str, Any]) -> bool:
-            risk_score = data.get('risk_score', 0)
-            confidence = data.get('confidence', 0)
-            
-            return risk_score >= 0.7 and confidence >= 0.8
-        
+            return data.get('risk_score', 0) >= 0.7 and data.get('confidence', 0) >= 0.8
+
+        def high_risk_prediction_v(df: pd.DataFrame) -> np.ndarray:
+            return high_risk_mask(_col(df, 'risk_score'), _col(df, 'confidence'))
+
         self.register_rule(AlertRule(
             name="high_risk_prediction",
             condition=high_risk_prediction,
+            vcondition=high_risk_prediction_v,
             alert_type=AlertType.PREDICTION_ALERT,
             severity=AlertSeverity.CRITICAL,
             message_template="Predicción de alto riesgo: score={risk_score:.2f}, "
                            "confianza={confidence:.2f}. "
                            "Se esperan aumentos significativos en indicadores críticos.",
-            cooldown_minutes=240
+            cooldown_minutes=240,
+            applicable_sources={'correlation', 'prediction'}
         ))
     
     def register_rule(self, rule: AlertRule):
         """Registrar una nueva regla de alerta"""
         self.rules.append(rule)
+        if rule.applicable_sources is None:
+            self._wildcard_rules.append(rule)
+        else:
+            for source in rule.applicable_sources:
+                self._rules_by_source.setdefault(source, []).append(rule)
+        self._dispatch_cache.clear()
         logger.info(f"Registered alert rule: {rule.name}")
+
+    def _rules_for(self, data_source: str) -> List[AlertRule]:
+        """Slice de reglas aplicables a una fuente (cacheado por fuente)"""
+        rules = self._dispatch_cache.get(data_source)
+        if rules is None:
+            rules = self._rules_by_source.get(data_source, []) + self._wildcard_rules
+            self._dispatch_cache[data_source] = rules
+        return rules
     
     async def evaluate_data(self, data_source: str, data: Dict[str, Any]) -> List[Alert]:
         """Evaluar datos contra todas las reglas registradas"""
         triggered_alerts = []
-        
-        for rule in self.rules:
+
+        rules = self._rules_for(data_source)
+        for rule in rules:
             try:
-                if rule.should_trigger(data):
-                    alert = rule.create_alert(data)
-                    
-                    # Agregar metadata adicional
-                    alert.data['data_source'] = data_source
-                    alert.data['rule_name'] = rule.name
+                started = time.perf_counter_ns()
+                fired = rule.should_trigger(data)
+                rule.total_time_ns += time.perf_counter_ns() - started
+                rule.eval_count += 1
+                if fired:
+                    rule.trigger_count += 1
+                    # Payload completo antes de crear y almacenar la alerta:
+                    # sin mutar el dict del llamante ni el objeto ya insertado
+                    alert = rule.create_alert({
+                        **data,
+                        'data_source': data_source,
+                        'rule_name': rule.name,
+                    })
                     
                     # Guardar alerta
                     self.active_alerts[alert.id] = alert
-                    self.alert_history.append(alert)
+                    if alert.expires_ts:
+                        heapq.heappush(self._expiry_heap, (alert.expires_ts, alert.id))
+                    self._append_history(alert)
                     
                     triggered_alerts.append(alert)
                     
@@ -263,11 +519,94 @@ class AlertEngine:
             except Exception as e:
                 logger.error(f"Error evaluating rule {rule.name}: {e}")
                 continue
-        
+
+        # Reordenado guiado por perfil cada _REORDER_EVERY evaluaciones
+        self._evals_since_reorder += len(rules)
+        if self._evals_since_reorder >= self._REORDER_EVERY:
+            self._reorder_rules()
+
         # Limpiar alertas expiradas
         self._clean_expired_alerts()
-        
+
         return triggered_alerts
+
+    async def evaluate_batch(self, data_source: str, df: pd.DataFrame) -> List[Alert]:
+        """Evaluar una ventana de observaciones contra las reglas de la fuente
+
+        Las reglas con twin vectorizado (`vcondition`) se evalúan como una
+        máscara booleana NumPy sobre la ventana completa, sin bucle Python
+        por fila; solo las filas que disparan se materializan a dict. Las
+        reglas sin twin caen al camino fila a fila de `should_trigger`.
+        """
+        triggered_alerts = []
+        if df is None or len(df) == 0:
+            return triggered_alerts
+
+        rules = self._rules_for(data_source)
+        rows = None  # filas como dicts; se materializan una sola vez y bajo demanda
+        for rule in rules:
+            try:
+                started = time.perf_counter_ns()
+                if rule.vcondition is not None:
+                    mask = np.asarray(rule.vcondition(df), dtype=bool)
+                    hits = np.flatnonzero(mask)
+                else:
+                    if rows is None:
+                        rows = df.to_dict('records')
+                    hits = [i for i, row in enumerate(rows)
+                            if rule.should_trigger(row)]
+                rule.total_time_ns += time.perf_counter_ns() - started
+                rule.eval_count += len(df)
+                for i in hits:
+                    # El cooldown sigue aplicando dentro del lote: tras el
+                    # primer disparo, las filas restantes quedan absorbidas
+                    if rule.in_cooldown():
+                        break
+                    if rows is None:
+                        rows = df.to_dict('records')
+                    rule.trigger_count += 1
+                    alert = rule.create_alert({
+                        **rows[i],
+                        'data_source': data_source,
+                        'rule_name': rule.name,
+                    })
+
+                    self.active_alerts[alert.id] = alert
+                    if alert.expires_ts:
+                        heapq.heappush(self._expiry_heap, (alert.expires_ts, alert.id))
+                    self._append_history(alert)
+                    triggered_alerts.append(alert)
+
+                    await self._send_notifications(alert)
+                    logger.info(f"Alert triggered: {alert.id} - {alert.title}")
+
+            except Exception as e:
+                logger.error(f"Error evaluating rule {rule.name} on batch: {e}")
+                continue
+
+        self._evals_since_reorder += len(rules) * len(df)
+        if self._evals_since_reorder >= self._REORDER_EVERY:
+            self._reorder_rules()
+
+        self._clean_expired_alerts()
+
+        return triggered_alerts
+
+    @staticmethod
+    def _rule_priority(rule: AlertRule) -> float:
+        """Prioridad de evaluación: tasa de disparo por unidad de coste"""
+        if rule.eval_count == 0:
+            return 0.0
+        avg_ns = rule.total_time_ns / rule.eval_count
+        return (rule.trigger_count / rule.eval_count) / (avg_ns + 1)
+
+    def _reorder_rules(self):
+        """Resituar las reglas baratas y de alta tasa de disparo al frente"""
+        for rules in self._rules_by_source.values():
+            rules.sort(key=self._rule_priority, reverse=True)
+        self._wildcard_rules.sort(key=self._rule_priority, reverse=True)
+        self._dispatch_cache.clear()
+        self._evals_since_reorder = 0
     
     async def evaluate_solar_data(self, solar_data: Dict[str, Any]) -> List[Alert]:
         """Evaluación especializada para datos solares"""
@@ -285,26 +624,36 @@ class AlertEngine:
         return alerts
     
     async def _send_notifications(self, alert: Alert):
-        """Enviar notificaciones por canales configurados"""
-        
+        """Enviar notificaciones por canales configurados (en paralelo)"""
+        tasks = []
+        channels = []
         for channel in self.notification_channels:
-            try:
-                if channel == 'log':
-                    self._send_log_notification(alert)
-                elif channel == 'email':
-                    await self._send_email_notification(alert)
-                elif channel == 'webhook':
-                    await self._send_webhook_notification(alert)
-                elif channel == 'slack':
-                    await self._send_slack_notification(alert)
-                else:
-                    logger.warning(f"Unknown notification channel: {channel}")
-                    
-            except Exception as e:
-                logger.error(f"Failed to send notification via {channel}: {e}")
+            if channel == 'log':
+                # Canal síncrono y no bloqueante: despacho directo, sin
+                # pagar un hilo ni una tarea por él
+                self._send_log_notification(alert)
+                continue
+            sender = self._channel_senders.get(channel)
+            if sender is None:
+                logger.warning(f"Unknown notification channel: {channel}")
+                continue
+            tasks.append(sender(alert))
+            channels.append(channel)
+
+        if not tasks:
+            return
+
+        # Un canal lento no serializa a los demás
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for channel, result in zip(channels, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to send notification via {channel}: {result}")
     
     def _send_log_notification(self, alert: Alert):
         """Enviar notificación a log"""
+        # No serializar el payload si el logger va a descartar el mensaje
+        if not logger.isEnabledFor(logging.WARNING):
+            return
         log_message = f"""
         🚨 ALERTA {alert.severity.value} - {alert.type.value}
         Título: {alert.title}
@@ -326,25 +675,26 @@ class AlertEngine:
             'to': ['admin@heliobio.social', 'research@heliobio.social']
         }
         
+        # Import diferido: el stack de email solo se paga si el canal está
+        # activo y llega a enviarse una alerta
+        from email.message import EmailMessage
+
         try:
-            msg = MIMEMultipart('alternative')
+            msg = EmailMessage()
             msg['Subject'] = f"[{alert.severity.value}] {alert.title}"
             msg['From'] = smtp_config['from']
             msg['To'] = ', '.join(smtp_config['to'])
-            
-            # Crear contenido HTML
-            html = f"""
+
+            # Alternativa en texto plano para clientes sin HTML
+            msg.set_content(
+                f"[{alert.severity.value}] {alert.title}\n\n{alert.message}"
+            )
+
+            # Crear contenido HTML (CSS invariante hoisted a _EMAIL_CSS)
+            html_doc = f"""
             <html>
             <head>
-                <style>
-                    body {{ font-family: Arial, sans-serif; }}
-                    .alert-critical {{ background-color: #ffcccc; border-left: 5px solid #ff0000; padding: 15px; }}
-                    .alert-high {{ background-color: #ffe6cc; border-left: 5px solid #ff6600; padding: 15px; }}
-                    .alert-moderate {{ background-color: #ffffcc; border-left: 5px solid #ffcc00; padding: 15px; }}
-                    .data-table {{ border-collapse: collapse; width: 100%; margin-top: 20px; }}
-                    .data-table th, .data-table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                    .data-table th {{ background-color: #f2f2f2; }}
-                </style>
+                <style>{_EMAIL_CSS}</style>
             </head>
             <body>
                 <div class="alert-{alert.severity.value.lower()}">
@@ -360,10 +710,14 @@ class AlertEngine:
                     <tr><th>Campo</th><th>Valor</th></tr>
             """
             
-            for key, value in alert.data.items():
-                html += f"<tr><td>{key}</td><td>{value}</td></tr>"
-            
-            html += """
+            # Filas construidas en una sola pasada con join (sin concatenación
+            # cuadrática) y con escape de los valores
+            html_doc += "\n".join(
+                f"<tr><td>{html.escape(str(key))}</td><td>{html.escape(str(value))}</td></tr>"
+                for key, value in alert.data.items()
+            )
+
+            html_doc += """
                 </table>
                 
                 <p><em>Esta alerta fue generada automáticamente por HelioBio-Social Alert System</em></p>
@@ -371,18 +725,33 @@ class AlertEngine:
             </html>
             """
             
-            msg.attach(MIMEText(html, 'html'))
-            
-            # Enviar email
-            with smtplib.SMTP(smtp_config['host'], smtp_config['port']) as server:
-                server.starttls()
-                server.login(smtp_config['username'], smtp_config['password'])
-                server.send_message(msg)
-                
+            msg.add_alternative(html_doc, subtype='html')
+
+            # smtplib es bloqueante: el envío va a un hilo para no parar el
+            # event loop durante el TLS+AUTH+DATA
+            await asyncio.to_thread(self._blocking_send_email, msg, smtp_config)
+
             logger.info(f"Email notification sent for alert {alert.id}")
             
         except Exception as e:
             logger.error(f"Failed to send email notification: {e}")
+
+    def _blocking_send_email(self, msg, smtp_config: Dict[str, Any]):
+        """Enviar por la sesión SMTP persistente (se ejecuta en un hilo)
+
+        Un solo reintento si el servidor cerró la conexión entre envíos.
+        """
+        import smtplib
+
+        with self._smtp_lock:
+            server = self._get_smtp(smtp_config)
+            try:
+                server.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPException):
+                self._close_smtp()
+                server = self._get_smtp(smtp_config)
+                server.send_message(msg)
+            self._smtp_sends += 1
     
     async def _send_webhook_notification(self, alert: Alert):
         """Enviar notificación a webhook"""
@@ -396,18 +765,16 @@ class AlertEngine:
         }
         
         try:
-            response = requests.post(
-                webhook_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Webhook notification sent for alert {alert.id}")
-            else:
-                logger.error(f"Webhook failed with status {response.status_code}")
-                
+            # orjson serializa ~5x más rápido y emite bytes directamente,
+            # sin la transcodificación str->bytes del camino json=
+            body = orjson.dumps(payload, default=_json_default)
+            async with self._get_http().post(webhook_url, data=body,
+                                             headers=_JSON_HEADERS) as response:
+                if response.status == 200:
+                    logger.info(f"Webhook notification sent for alert {alert.id}")
+                else:
+                    logger.error(f"Webhook failed with status {response.status}")
+
         except Exception as e:
             logger.error(f"Failed to send webhook notification: {e}")
     
@@ -416,18 +783,9 @@ class AlertEngine:
         # Configuración de Slack (debería venir de variables de entorno)
         slack_webhook = "https://hooks.slack.com/services/..."
         
-        # Determinar color según severidad
-        color_map = {
-            AlertSeverity.CRITICAL: "#ff0000",
-            AlertSeverity.HIGH: "#ff6600",
-            AlertSeverity.MODERATE: "#ffcc00",
-            AlertSeverity.LOW: "#3366ff",
-            AlertSeverity.INFO: "#00cc00"
-        }
-        
         payload = {
             'attachments': [{
-                'color': color_map.get(alert.severity, "#cccccc"),
+                'color': _SLACK_COLOR.get(alert.severity, "#cccccc"),
                 'title': f"🚨 {alert.title}",
                 'text': alert.message,
                 'fields': [
@@ -453,33 +811,30 @@ class AlertEngine:
         }
         
         try:
-            response = requests.post(
-                slack_webhook,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Slack notification sent for alert {alert.id}")
-            else:
-                logger.error(f"Slack webhook failed with status {response.status_code}")
-                
+            body = orjson.dumps(payload, default=_json_default)
+            async with self._get_http().post(slack_webhook, data=body,
+                                             headers=_JSON_HEADERS) as response:
+                if response.status == 200:
+                    logger.info(f"Slack notification sent for alert {alert.id}")
+                else:
+                    logger.error(f"Slack webhook failed with status {response.status}")
+
         except Exception as e:
             logger.error(f"Failed to send Slack notification: {e}")
     
     def _clean_expired_alerts(self):
         """Limpiar alertas expiradas de active_alerts"""
-        now = datetime.now()
-        expired_ids = []
-        
-        for alert_id, alert in self.active_alerts.items():
-            if alert.expires_at and alert.expires_at < now:
-                expired_ids.append(alert_id)
-        
-        for alert_id in expired_ids:
-            del self.active_alerts[alert_id]
-            logger.info(f"Expired alert removed: {alert_id}")
+        # Pop del heap mientras la expiración más próxima ya venció: O(log K)
+        # amortizado por alerta expirada, O(1) cuando no hay nada que limpiar
+        now_ts = time.time()
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now_ts:
+            _, alert_id = heapq.heappop(heap)
+            # La alerta puede haber sido retirada por otra vía (p.ej. un
+            # borrado manual); comprobar pertenencia antes de eliminar
+            if alert_id in self.active_alerts:
+                del self.active_alerts[alert_id]
+                logger.info(f"Expired alert removed: {alert_id}")
     
     def get_active_alerts(self, severity: Optional[AlertSeverity] = None) -> List[Dict[str, Any]]:
         """Obtener alertas activas, opcionalmente filtradas por severidad"""
@@ -490,9 +845,23 @@ class AlertEngine:
         
         return [alert.to_dict() for alert in alerts]
     
+    def _append_history(self, alert: Alert):
+        """Registrar la alerta en el historial y en la ventana de 24h"""
+        self.alert_history.append(alert)
+        self._recent_24h.append((alert.timestamp.timestamp(), alert))
+        self._prune_recent()
+
+    def _prune_recent(self):
+        """Retirar de la ventana de 24h las alertas que ya salieron de ella"""
+        cutoff = time.time() - 86400
+        recent = self._recent_24h
+        while recent and recent[0][0] < cutoff:
+            recent.popleft()
+
     def get_alert_history(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Obtener historial de alertas"""
-        recent_history = self.alert_history[-limit:] if self.alert_history else []
+        # islice sobre el deque invertido: sin copiar el historial completo
+        recent_history = list(islice(reversed(self.alert_history), limit))[::-1]
         return [alert.to_dict() for alert in recent_history]
     
     def acknowledge_alert(self, alert_id: str, acknowledged_by: str) -> bool:
@@ -507,14 +876,11 @@ class AlertEngine:
     
     def get_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del sistema de alertas"""
-        now = datetime.now()
-        last_24h = now - timedelta(hours=24)
-        
-        alerts_last_24h = [
-            a for a in self.alert_history 
-            if a.timestamp > last_24h
-        ]
-        
+        # La ventana de 24h ya viene mantenida por inserción: solo hay que
+        # podar el frente, no filtrar el historial completo
+        self._prune_recent()
+        alerts_last_24h = [alert for _, alert in self._recent_24h]
+
         by_severity = {}
         by_type = {}
         
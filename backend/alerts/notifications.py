@@ -8,15 +8,240 @@ import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Dict, List, Optional, Any
+import hashlib
+import html
 import logging
-import json
-from datetime import datetime
-import requests
+import orjson
+import random
+import string
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import takewhile
+from urllib.parse import urlsplit
+import aiohttp
 from dataclasses import dataclass
 import os
 
 logger = logging.getLogger(__name__)
 
+# Cabeceras del POST JSON (orjson ya emite bytes)
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+def _pretty_json(value: Any) -> str:
+    """Volcado JSON indentado sobre el codificador C de orjson"""
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2, default=str).decode()
+
+# Plantillas compiladas una sola vez en import: cada alerta hace una única
+# pasada de sustitución en lugar de reconstruir el documento con f-strings
+# anidados y concatenación en bucle. Los valores dinámicos del HTML se
+# escapan con html.escape antes de sustituir.
+_SEVERITY_COLOR = {
+    'CRITICAL': '#ff0000',
+    'HIGH': '#ff6600',
+    'MODERATE': '#ffcc00',
+    'LOW': '#3366ff',
+    'INFO': '#00cc00',
+}
+
+_SEVERITY_EMOJI = {
+    'CRITICAL': '🚨🚨',
+    'HIGH': '🚨',
+    'MODERATE': '⚠️',
+    'LOW': '🔔',
+    'INFO': 'ℹ️',
+}
+
+_TELEGRAM_EMOJI = {
+    'CRITICAL': '🔴🔴',
+    'HIGH': '🔴',
+    'MODERATE': '🟡',
+    'LOW': '🔵',
+    'INFO': '🟢',
+}
+
+_HTML_HEAD_TEMPLATE = string.Template("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>HelioBio-Social Alert</title>
+            <style>
+                body {
+                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+                    line-height: 1.6;
+                    color: #333;
+                    max-width: 800px;
+                    margin: 0 auto;
+                    padding: 20px;
+                }
+                .alert-header {
+                    background-color: ${bg_color};
+                    color: white;
+                    padding: 20px;
+                    border-radius: 8px 8px 0 0;
+                    margin-bottom: 0;
+                }
+                .alert-content {
+                    background-color: #f9f9f9;
+                    padding: 20px;
+                    border: 1px solid #ddd;
+                    border-top: none;
+                    border-radius: 0 0 8px 8px;
+                }
+                .severity-badge {
+                    display: inline-block;
+                    padding: 5px 10px;
+                    background-color: ${bg_color};
+                    color: white;
+                    border-radius: 4px;
+                    font-weight: bold;
+                    margin-right: 10px;
+                }
+                .data-table {
+                    width: 100%;
+                    border-collapse: collapse;
+                    margin-top: 20px;
+                }
+                .data-table th {
+                    background-color: #f2f2f2;
+                    text-align: left;
+                    padding: 12px;
+                    border: 1px solid #ddd;
+                }
+                .data-table td {
+                    padding: 12px;
+                    border: 1px solid #ddd;
+                }
+                .timestamp {
+                    color: #666;
+                    font-size: 0.9em;
+                }
+                .footer {
+                    margin-top: 30px;
+                    padding-top: 20px;
+                    border-top: 1px solid #eee;
+                    color: #666;
+                    font-size: 0.9em;
+                }
+                @media (max-width: 600px) {
+                    .data-table {
+                        font-size: 0.9em;
+                    }
+                    .data-table th, .data-table td {
+                        padding: 8px;
+                    }
+                }
+            </style>
+        </head>
+        <body>
+            <div class="alert-header">
+                <h1 style="margin: 0;">🚨 HelioBio-Social Alert System</h1>
+            </div>
+            
+            <div class="alert-content">
+""")
+
+# "Chrome" del email precalculado por severidad: el bloque <style> y la
+# cabecera (~1.5 KB) son idénticos para todas las alertas del mismo color,
+# así que se renderizan una vez en import y por alerta solo se sustituye
+# el cuerpo dinámico
+_PRECOMPUTED_HTML_HEAD = {
+    severity: _HTML_HEAD_TEMPLATE.substitute(bg_color=color)
+    for severity, color in _SEVERITY_COLOR.items()
+}
+_DEFAULT_HTML_HEAD = _HTML_HEAD_TEMPLATE.substitute(bg_color='#cccccc')
+
+_HTML_BODY_TEMPLATE = string.Template("""                <h2>${title}</h2>
+                
+                <div>
+                    <span class="severity-badge">${severity}</span>
+                    <span><strong>Type:</strong> ${alert_type}</span>
+                </div>
+                
+                <p class="timestamp">
+                    <strong>Timestamp:</strong> ${timestamp}
+                </p>
+                
+                <div style="margin: 20px 0; padding: 15px; background-color: #fff; border-left: 4px solid ${bg_color};">
+                    <p style="margin: 0; font-size: 1.1em;"><strong>Message:</strong><br>
+                    ${message}</p>
+                </div>
+                
+                <h3>Alert Data:</h3>
+                <table class="data-table">
+                    <thead>
+                        <tr>
+                            <th>Field</th>
+                            <th>Value</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+${rows}
+                    </tbody>
+                </table>
+                
+                <div class="footer">
+                    <p>
+                        <strong>Alert ID:</strong> ${alert_id}<br>
+                        <strong>Generated by:</strong> HelioBio-Scientific Alert System<br>
+                        <strong>System:</strong> Solar-Mental Health Correlation Monitor
+                    </p>
+                    <p style="font-size: 0.8em;">
+                        This is an automated message. Please do not reply to this email.<br>
+                        To manage your alert preferences, visit the HelioBio-Social dashboard.
+                    </p>
+                </div>
+""")
+
+_HTML_TAIL = """            </div>
+        </body>
+        </html>
+        """
+
+_EMAIL_TEXT_TEMPLATE = string.Template("""
+        HELIOBIO-SOCIAL ALERT SYSTEM
+        ${rule}
+        
+        ALERT: ${title}
+        
+        Severity: ${severity}
+        Type: ${alert_type}
+        Timestamp: ${timestamp}
+        Alert ID: ${alert_id}
+        
+        MESSAGE:
+        ${message}
+        
+        ${rule}
+        
+        ALERT DATA:
+        ${rows}
+        
+        ${rule}
+        
+        This is an automated alert from the HelioBio-Social system.
+        Solar-Mental Health Correlation Monitoring System.
+        
+        For more information or to manage alerts, visit the dashboard.
+        """)
+
+_TELEGRAM_TEMPLATE = string.Template("""
+        ${emoji} <b>HELIOBIO-SOCIAL ALERT</b>
+        
+        <b>Title:</b> ${title}
+        <b>Severity:</b> ${severity}
+        <b>Type:</b> ${alert_type}
+        <b>Time:</b> ${timestamp}
+        <b>ID:</b> ${alert_id}
+        
+        <b>Message:</b>
+        ${message}
+        
+        <i>Automated alert from HelioBio-Social Correlation System</i>
+        """)
+
 @dataclass
 class NotificationConfig:
     """Configuración de notificaciones"""
@@ -50,13 +275,139 @@ class NotificationConfig:
 
 class NotificationService:
     """Servicio de notificaciones"""
-    
+
+    # Tamaño del pool de workers y de la cola de despacho: la cola acotada
+    # aplica backpressure a los productores en ráfagas en lugar de abrir
+    # cientos de sockets en un mismo tick
+    _WORKER_COUNT = 16
+    _QUEUE_MAXSIZE = 1024
+
     def __init__(self, config: NotificationConfig = None):
         self.config = config or NotificationConfig()
-        self.notification_history = []
-        
+        # Ring buffer: memoria constante con desalojo automático de lo más
+        # antiguo, en lugar de una lista que crece sin límite
+        self.notification_history: deque = deque(
+            maxlen=int(os.getenv('NOTIF_HISTORY_CAP', 10_000))
+        )
+
+        # Sesión HTTP compartida (perezosa): keep-alive reutiliza las
+        # conexiones TCP+TLS hacia Slack/webhook/Telegram en lugar de pagar
+        # un handshake (y un hilo del pool) por cada POST
+        self._http: Optional[aiohttp.ClientSession] = None
+
+        # Cola de despacho + pool de workers (creados perezosamente dentro
+        # del event loop en el primer enqueue)
+        self._send_queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+        # Un semáforo por host destino: acota la concurrencia saliente
+        # hacia cada servicio durante las ráfagas de alertas
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+        # Ventana de colapso: alertas idénticas (tipo, severidad, mensaje)
+        # dentro del TTL se funden en un único envío. Una misma muestra de
+        # tormenta puede disparar varias reglas casi duplicadas a la vez
+        self._recent_sends: Dict[tuple, float] = {}
+        self._collapse_ttl = float(os.getenv('NOTIF_COLLAPSE_TTL', 60))
+
+        # Conexión SMTP persistente: conectar+STARTTLS+AUTH es ~la mitad del
+        # coste de cada email; se paga una vez y se reutiliza. El lock
+        # serializa el acceso (SMTP es un protocolo secuencial con estado)
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._smtp_lock = asyncio.Lock()
+
         # Cargar configuración desde variables de entorno
         self._load_from_env()
+
+    def _get_http(self) -> aiohttp.ClientSession:
+        """Obtener la sesión HTTP compartida, creándola en el primer uso"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=256,
+                    limit_per_host=64,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=75,
+                ),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._http
+
+    async def _post_with_retry(self, url: str, data: bytes,
+                               headers: Dict[str, str] = None,
+                               max_tries: int = 3, base: float = 0.25):
+        """POST con reintento exponencial y respeto del rate limit
+
+        Un 429 o un 5xx transitorio se reintenta con back-off exponencial
+        (más jitter); si el servicio expone Retry-After se duerme lo que
+        pida. Un 4xx distinto de 429 es terminal. Devuelve (status, body)
+        con body decodificado como JSON cuando lo hay.
+        """
+        host = urlsplit(url).hostname or url
+        sem = self._host_limits.setdefault(host, asyncio.Semaphore(64))
+        async with sem:
+            for attempt in range(max_tries):
+                last_attempt = attempt + 1 >= max_tries
+                try:
+                    async with self._get_http().post(
+                        url, data=data, headers=headers
+                    ) as response:
+                        if response.status == 429 or response.status >= 500:
+                            if last_attempt:
+                                return response.status, None
+                            retry_after = response.headers.get('Retry-After')
+                            try:
+                                delay = float(retry_after)
+                            except (TypeError, ValueError):
+                                delay = base * 2 ** attempt + random.random() * 0.1
+                            await asyncio.sleep(delay)
+                            continue
+                        try:
+                            body = await response.json()
+                        except (aiohttp.ContentTypeError, ValueError):
+                            body = None
+                        return response.status, body
+                except aiohttp.ClientError:
+                    if last_attempt:
+                        raise
+                    await asyncio.sleep(base * 2 ** attempt + random.random() * 0.1)
+
+    async def _get_smtp(self) -> aiosmtplib.SMTP:
+        """Obtener la conexión SMTP persistente (llamar con _smtp_lock tomado)
+
+        Reconecta de forma perezosa si el servidor cerró la sesión.
+        """
+        smtp = self._smtp
+        if smtp is None or not smtp.is_connected:
+            smtp = aiosmtplib.SMTP(
+                hostname=self.config.smtp_host,
+                port=self.config.smtp_port,
+                username=self.config.smtp_username,
+                password=self.config.smtp_password,
+                use_tls=True
+            )
+            await smtp.connect()
+            self._smtp = smtp
+        return smtp
+
+    async def close(self):
+        """Liberar recursos de red del servicio (llamar en el shutdown)"""
+        if self._workers:
+            await self.drain()
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+            self._send_queue = None
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        async with self._smtp_lock:
+            if self._smtp is not None and self._smtp.is_connected:
+                try:
+                    await self._smtp.quit()
+                except aiosmtplib.SMTPException:
+                    pass
+            self._smtp = None
     
     def _load_from_env(self):
         """Cargar configuración desde variables de entorno"""
@@ -93,52 +444,121 @@ class NotificationService:
                                      channels: List[str] = None) -> Dict[str, bool]:
         """Enviar notificación de alerta por canales especificados"""
         
+        # Colapso de duplicados: si ya se envió una alerta idéntica dentro
+        # de la ventana, se registra y no se vuelve a molestar a los canales
+        now = time.time()
+        collapse_key = (
+            alert_data.get('type'),
+            alert_data.get('severity'),
+            hashlib.blake2b(
+                str(alert_data.get('message', '')).encode(), digest_size=8
+            ).digest(),
+        )
+        if now - self._recent_sends.get(collapse_key, 0.0) < self._collapse_ttl:
+            logger.info(f"Collapsed duplicate notification for alert {alert_data.get('id')}")
+            return {'collapsed': True}
+        self._recent_sends[collapse_key] = now
+        if len(self._recent_sends) > 256:
+            self._evict_recent(now)
+
         if channels is None:
             channels = self._get_enabled_channels()
         
         results = {}
-        
+
+        senders = {
+            'email': (self.config.email_enabled, self._send_email),
+            'webhook': (self.config.webhook_enabled, self._send_webhook),
+            'slack': (self.config.slack_enabled, self._send_slack),
+            'telegram': (self.config.telegram_enabled, self._send_telegram),
+        }
+
+        # Despacho concurrente: el coste de pared pasa de la suma de RTTs de
+        # los canales al máximo de ellos
+        tasks = {}
         for channel in channels:
-            try:
-                if channel == 'email' and self.config.email_enabled:
-                    success = await self._send_email(alert_data)
-                    results['email'] = success
-                    
-                elif channel == 'webhook' and self.config.webhook_enabled:
-                    success = await self._send_webhook(alert_data)
-                    results['webhook'] = success
-                    
-                elif channel == 'slack' and self.config.slack_enabled:
-                    success = await self._send_slack(alert_data)
-                    results['slack'] = success
-                    
-                elif channel == 'telegram' and self.config.telegram_enabled:
-                    success = await self._send_telegram(alert_data)
-                    results['telegram'] = success
-                    
-                elif channel == 'log':
-                    self._send_log(alert_data)
-                    results['log'] = True
-                    
-                else:
-                    logger.warning(f"Channel {channel} not enabled or not supported")
-                    results[channel] = False
-                    
-            except Exception as e:
-                logger.error(f"Failed to send notification via {channel}: {e}")
+            if channel == 'log':
+                self._send_log(alert_data)
+                results['log'] = True
+                continue
+            enabled, sender = senders.get(channel, (False, None))
+            if not enabled:
+                logger.warning(f"Channel {channel} not enabled or not supported")
                 results[channel] = False
-        
-        # Registrar en historial
+                continue
+            tasks[channel] = sender(alert_data)
+
+        if tasks:
+            try:
+                # Tope global: un canal colgado no puede retener la alerta
+                done = await asyncio.wait_for(
+                    asyncio.gather(*tasks.values(), return_exceptions=True),
+                    timeout=15
+                )
+            except asyncio.TimeoutError:
+                logger.error(f"Notification dispatch timed out for alert {alert_data.get('id')}")
+                for channel in tasks:
+                    results.setdefault(channel, False)
+            else:
+                for channel, outcome in zip(tasks, done):
+                    if isinstance(outcome, Exception):
+                        logger.error(f"Failed to send notification via {channel}: {outcome}")
+                        results[channel] = False
+                    else:
+                        results[channel] = bool(outcome)
+        
+        # Registrar en historial (solo los campos de las estadísticas, no el
+        # payload completo de la alerta: ~10x menos bytes por entrada)
         self.notification_history.append({
             'timestamp': datetime.now(),
             'alert_id': alert_data.get('id'),
             'channels': channels,
             'results': results,
-            'alert_data': alert_data
+            'severity': alert_data.get('severity')
         })
         
         return results
     
+    async def enqueue_alert(self, alert_data: Dict[str, Any],
+                            channels: List[str] = None):
+        """Encolar una alerta para despacho por el pool de workers
+
+        A diferencia de send_alert_notification (despacho directo con
+        resultado), esta ruta aplica backpressure: con la cola llena el
+        productor espera en lugar de desbordar el loop de corrutinas.
+        """
+        if self._send_queue is None:
+            self._send_queue = asyncio.Queue(maxsize=self._QUEUE_MAXSIZE)
+            self._workers = [
+                asyncio.create_task(self._dispatcher_worker())
+                for _ in range(self._WORKER_COUNT)
+            ]
+        await self._send_queue.put((alert_data, channels))
+
+    async def drain(self):
+        """Esperar a que el pool procese todo lo encolado"""
+        if self._send_queue is not None:
+            await self._send_queue.join()
+
+    async def _dispatcher_worker(self):
+        """Worker del pool: consume la cola y despacha cada alerta"""
+        while True:
+            alert_data, channels = await self._send_queue.get()
+            try:
+                await self.send_alert_notification(alert_data, channels)
+            except Exception as e:
+                logger.error(f"Dispatcher worker failed for alert {alert_data.get('id')}: {e}")
+            finally:
+                self._send_queue.task_done()
+
+    def _evict_recent(self, now: float):
+        """Retirar de la ventana de colapso las entradas ya vencidas"""
+        ttl = self._collapse_ttl
+        self._recent_sends = {
+            key: ts for key, ts in self._recent_sends.items()
+            if now - ts < ttl
+        }
+
     def _get_enabled_channels(self) -> List[str]:
         """Obtener lista de canales habilitados"""
         channels = ['log']  # Siempre log
@@ -170,15 +590,16 @@ class NotificationService:
             msg.attach(MIMEText(text_content, 'plain'))
             msg.attach(MIMEText(html_content, 'html'))
             
-            # Enviar usando aiosmtplib (async)
-            await aiosmtplib.send(
-                msg,
-                hostname=self.config.smtp_host,
-                port=self.config.smtp_port,
-                username=self.config.smtp_username,
-                password=self.config.smtp_password,
-                use_tls=True
-            )
+            # Enviar por la conexión persistente; un solo reintento si el
+            # servidor la cerró entre envíos
+            async with self._smtp_lock:
+                smtp = await self._get_smtp()
+                try:
+                    await smtp.send_message(msg)
+                except aiosmtplib.SMTPServerDisconnected:
+                    self._smtp = None
+                    smtp = await self._get_smtp()
+                    await smtp.send_message(msg)
             
             logger.info(f"Email notification sent for alert {alert_data.get('id')}")
             return True
@@ -193,226 +614,76 @@ class NotificationService:
         alert_type = alert_data.get('type', 'ALERT')
         title = alert_data.get('title', '')
         
-        emoji = {
-            'CRITICAL': '🚨🚨',
-            'HIGH': '🚨',
-            'MODERATE': '⚠️',
-            'LOW': '🔔',
-            'INFO': 'ℹ️'
-        }.get(severity, '📧')
+        emoji = _SEVERITY_EMOJI.get(severity, '📧')
         
         return f"{emoji} [{severity}] {alert_type}: {title}"
     
     def _create_email_html(self, alert_data: Dict[str, Any]) -> str:
         """Crear contenido HTML del email"""
-        
-        # Mapa de colores según severidad
-        color_map = {
-            'CRITICAL': '#ff0000',
-            'HIGH': '#ff6600',
-            'MODERATE': '#ffcc00',
-            'LOW': '#3366ff',
-            'INFO': '#00cc00'
-        }
-        
         severity = alert_data.get('severity', 'UNKNOWN')
-        bg_color = color_map.get(severity, '#cccccc')
-        
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>HelioBio-Social Alert</title>
-            <style>
-                body {{
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                    max-width: 800px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }}
-                .alert-header {{
-                    background-color: {bg_color};
-                    color: white;
-                    padding: 20px;
-                    border-radius: 8px 8px 0 0;
-                    margin-bottom: 0;
-                }}
-                .alert-content {{
-                    background-color: #f9f9f9;
-                    padding: 20px;
-                    border: 1px solid #ddd;
-                    border-top: none;
-                    border-radius: 0 0 8px 8px;
-                }}
-                .severity-badge {{
-                    display: inline-block;
-                    padding: 5px 10px;
-                    background-color: {bg_color};
-                    color: white;
-                    border-radius: 4px;
-                    font-weight: bold;
-                    margin-right: 10px;
-                }}
-                .data-table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin-top: 20px;
-                }}
-                .data-table th {{
-                    background-color: #f2f2f2;
-                    text-align: left;
-                    padding: 12px;
-                    border: 1px solid #ddd;
-                }}
-                .data-table td {{
-                    padding: 12px;
-                    border: 1px solid #ddd;
-                }}
-                .timestamp {{
-                    color: #666;
-                    font-size: 0.9em;
-                }}
-                .footer {{
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 1px solid #eee;
-                    color: #666;
-                    font-size: 0.9em;
-                }}
-                @media (max-width: 600px) {{
-                    .data-table {{
-                        font-size: 0.9em;
-                    }}
-                    .data-table th, .data-table td {{
-                        padding: 8px;
-                    }}
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="alert-header">
-                <h1 style="margin: 0;">🚨 HelioBio-Social Alert System</h1>
-            </div>
-            
-            <div class="alert-content">
-                <h2>{alert_data.get('title', 'Alert')}</h2>
-                
-                <div>
-                    <span class="severity-badge">{severity}</span>
-                    <span><strong>Type:</strong> {alert_data.get('type', 'N/A')}</span>
-                </div>
-                
-                <p class="timestamp">
-                    <strong>Timestamp:</strong> {alert_data.get('timestamp', 'N/A')}
-                </p>
-                
-                <div style="margin: 20px 0; padding: 15px; background-color: #fff; border-left: 4px solid {bg_color};">
-                    <p style="margin: 0; font-size: 1.1em;"><strong>Message:</strong><br>
-                    {alert_data.get('message', 'No message provided')}</p>
-                </div>
-                
-                <h3>Alert Data:</h3>
-                <table class="data-table">
-                    <thead>
-                        <tr>
-                            <th>Field</th>
-                            <th>Value</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-        """
-        
-        # Agregar datos de la alerta
-        for key, value in alert_data.get('data', {}).items():
-            if isinstance(value, dict) or isinstance(value, list):
-                value = json.dumps(value, indent=2)
-            html += f"""
-                        <tr>
-                            <td><strong>{key}</strong></td>
-                            <td>{value}</td>
-                        </tr>
-            """
-        
-        html += f"""
-                    </tbody>
-                </table>
-                
-                <div class="footer">
-                    <p>
-                        <strong>Alert ID:</strong> {alert_data.get('id', 'N/A')}<br>
-                        <strong>Generated by:</strong> HelioBio-Scientific Alert System<br>
-                        <strong>System:</strong> Solar-Mental Health Correlation Monitor
-                    </p>
-                    <p style="font-size: 0.8em;">
-                        This is an automated message. Please do not reply to this email.<br>
-                        To manage your alert preferences, visit the HelioBio-Social dashboard.
-                    </p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html
-    
+
+        # Filas de la tabla en una sola pasada con join y valores escapados
+        rows = "\n".join(
+            f"                        <tr>"
+            f"<td><strong>{html.escape(str(key))}</strong></td>"
+            f"<td>{html.escape(self._format_value(value))}</td>"
+            f"</tr>"
+            for key, value in alert_data.get('data', {}).items()
+        )
+
+        # Cabecera por severidad ya renderizada en import; por alerta solo
+        # se sustituye el cuerpo dinámico (campos escapados contra inyección)
+        head = _PRECOMPUTED_HTML_HEAD.get(severity, _DEFAULT_HTML_HEAD)
+        body = _HTML_BODY_TEMPLATE.substitute(
+            bg_color=_SEVERITY_COLOR.get(severity, '#cccccc'),
+            severity=html.escape(severity),
+            title=html.escape(str(alert_data.get('title', 'Alert'))),
+            alert_type=html.escape(str(alert_data.get('type', 'N/A'))),
+            timestamp=html.escape(str(alert_data.get('timestamp', 'N/A'))),
+            message=html.escape(str(alert_data.get('message', 'No message provided'))),
+            rows=rows,
+            alert_id=html.escape(str(alert_data.get('id', 'N/A'))),
+        )
+        return head + body + _HTML_TAIL
+
+    @staticmethod
+    def _format_value(value: Any) -> str:
+        """Representación de un valor del payload para las plantillas"""
+        if isinstance(value, (dict, list)):
+            return _pretty_json(value)
+        return str(value)
+
     def _create_email_text(self, alert_data: Dict[str, Any]) -> str:
         """Crear contenido de texto plano para email"""
-        text = f"""
-        HELIOBIO-SOCIAL ALERT SYSTEM
-        {'=' * 50}
-        
-        ALERT: {alert_data.get('title', 'Unknown Alert')}
-        
-        Severity: {alert_data.get('severity', 'UNKNOWN')}
-        Type: {alert_data.get('type', 'UNKNOWN')}
-        Timestamp: {alert_data.get('timestamp', 'N/A')}
-        Alert ID: {alert_data.get('id', 'N/A')}
-        
-        MESSAGE:
-        {alert_data.get('message', 'No message provided')}
-        
-        {'=' * 50}
-        
-        ALERT DATA:
-        """
-        
-        for key, value in alert_data.get('data', {}).items():
-            if isinstance(value, dict) or isinstance(value, list):
-                value = json.dumps(value, indent=2)
-            text += f"\n{key}: {value}"
-        
-        text += f"""
-        
-        {'=' * 50}
-        
-        This is an automated alert from the HelioBio-Social system.
-        Solar-Mental Health Correlation Monitoring System.
-        
-        For more information or to manage alerts, visit the dashboard.
-        """
-        
-        return text
-    
+        rows = "\n".join(
+            f"{key}: {self._format_value(value)}"
+            for key, value in alert_data.get('data', {}).items()
+        )
+
+        return _EMAIL_TEXT_TEMPLATE.substitute(
+            rule='=' * 50,
+            title=alert_data.get('title', 'Unknown Alert'),
+            severity=alert_data.get('severity', 'UNKNOWN'),
+            alert_type=alert_data.get('type', 'UNKNOWN'),
+            timestamp=alert_data.get('timestamp', 'N/A'),
+            alert_id=alert_data.get('id', 'N/A'),
+            message=alert_data.get('message', 'No message provided'),
+            rows=rows,
+        )
+
     async def _send_webhook(self, alert_data: Dict[str, Any]) -> bool:
         """Enviar notificación a webhook"""
         try:
-            response = await asyncio.to_thread(
-                requests.post,
+            status, _ = await self._post_with_retry(
                 self.config.webhook_url,
-                json=alert_data,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
+                data=orjson.dumps(alert_data, default=str),
+                headers=_JSON_HEADERS
             )
-            
-            if response.status_code in [200, 201, 202]:
+            if status in (200, 201, 202):
                 logger.info(f"Webhook notification sent successfully for alert {alert_data.get('id')}")
                 return True
             else:
-                logger.error(f"Webhook failed with status {response.status_code}")
+                logger.error(f"Webhook failed with status {status}")
                 return False
                 
         except Exception as e:
@@ -422,17 +693,8 @@ class NotificationService:
     async def _send_slack(self, alert_data: Dict[str, Any]) -> bool:
         """Enviar notificación a Slack"""
         try:
-            # Determinar color según severidad
-            color_map = {
-                'CRITICAL': '#ff0000',
-                'HIGH': '#ff6600',
-                'MODERATE': '#ffcc00',
-                'LOW': '#3366ff',
-                'INFO': '#00cc00'
-            }
-            
             severity = alert_data.get('severity', 'UNKNOWN')
-            color = color_map.get(severity, '#cccccc')
+            color = _SEVERITY_COLOR.get(severity, '#cccccc')
             
             # Crear payload de Slack
             slack_payload = {
@@ -471,24 +733,21 @@ class NotificationService:
             if alert_data.get('data'):
                 data_field = {
                     'title': 'Alert Data',
-                    'value': json.dumps(alert_data['data'], indent=2),
+                    'value': _pretty_json(alert_data['data']),
                     'short': False
                 }
                 slack_payload['attachments'][0]['fields'].append(data_field)
             
-            response = await asyncio.to_thread(
-                requests.post,
+            status, _ = await self._post_with_retry(
                 self.config.slack_webhook_url,
-                json=slack_payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
+                data=orjson.dumps(slack_payload, default=str),
+                headers=_JSON_HEADERS
             )
-            
-            if response.status_code == 200:
+            if status == 200:
                 logger.info(f"Slack notification sent for alert {alert_data.get('id')}")
                 return True
             else:
-                logger.error(f"Slack failed with status {response.status_code}")
+                logger.error(f"Slack failed with status {status}")
                 return False
                 
         except Exception as e:
@@ -510,15 +769,11 @@ class NotificationService:
                 'disable_web_page_preview': True
             }
             
-            response = await asyncio.to_thread(
-                requests.post,
-                url,
-                json=payload,
-                timeout=10
+            _, result = await self._post_with_retry(
+                url, data=orjson.dumps(payload), headers=_JSON_HEADERS
             )
-            
-            result = response.json()
-            
+            result = result or {}
+
             if result.get('ok'):
                 logger.info(f"Telegram notification sent for alert {alert_data.get('id')}")
                 return True
@@ -533,35 +788,17 @@ class NotificationService:
     def _format_telegram_message(self, alert_data: Dict[str, Any]) -> str:
         """Formatear mensaje para Telegram"""
         severity = alert_data.get('severity', 'UNKNOWN')
-        
-        # Emojis según severidad
-        emoji_map = {
-            'CRITICAL': '🔴🔴',
-            'HIGH': '🔴',
-            'MODERATE': '🟡',
-            'LOW': '🔵',
-            'INFO': '🟢'
-        }
-        
-        emoji = emoji_map.get(severity, '⚪')
-        
-        message = f"""
-        {emoji} <b>HELIOBIO-SOCIAL ALERT</b>
-        
-        <b>Title:</b> {alert_data.get('title', 'N/A')}
-        <b>Severity:</b> {severity}
-        <b>Type:</b> {alert_data.get('type', 'N/A')}
-        <b>Time:</b> {alert_data.get('timestamp', 'N/A')}
-        <b>ID:</b> {alert_data.get('id', 'N/A')}
-        
-        <b>Message:</b>
-        {alert_data.get('message', 'No message')}
-        
-        <i>Automated alert from HelioBio-Social Correlation System</i>
-        """
-        
-        return message
-    
+
+        return _TELEGRAM_TEMPLATE.substitute(
+            emoji=_TELEGRAM_EMOJI.get(severity, '⚪'),
+            title=html.escape(str(alert_data.get('title', 'N/A'))),
+            severity=html.escape(severity),
+            alert_type=html.escape(str(alert_data.get('type', 'N/A'))),
+            timestamp=html.escape(str(alert_data.get('timestamp', 'N/A'))),
+            alert_id=html.escape(str(alert_data.get('id', 'N/A'))),
+            message=html.escape(str(alert_data.get('message', 'No message'))),
+        )
+
     def _send_log(self, alert_data: Dict[str, Any]):
         """Registrar alerta en log"""
         logger.warning(f"""
@@ -570,14 +807,19 @@ class NotificationService:
         Title: {alert_data.get('title')}
         Severity: {alert_data.get('severity')}
         Message: {alert_data.get('message')}
-        Data: {json.dumps(alert_data.get('data'), indent=2)}
+        Data: {_pretty_json(alert_data.get('data'))}
         """)
     
     def get_notification_stats(self, hours: int = 24) -> Dict[str, Any]:
         """Obtener estadísticas de notificaciones"""
         cutoff = datetime.now() - timedelta(hours=hours)
-        
-        recent = [n for n in self.notification_history if n['timestamp'] > cutoff]
+
+        # El deque está ordenado por tiempo: recorrer desde el final y cortar
+        # en la primera entrada fuera de la ventana, sin escanear todo
+        recent = list(takewhile(
+            lambda n: n['timestamp'] > cutoff,
+            reversed(self.notification_history)
+        ))
         
         stats = {
             'total_notifications': len(self.notification_history),
@@ -0,0 +1,61 @@
+"""
+Kernels numéricos para la evaluación por lotes de reglas de alerta
+Compilados con numba cuando está disponible; degradan a NumPy vectorizado
+(mismas máscaras, sin JIT) cuando no lo está.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba es opcional: NumPy vectorizado como fallback
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+
+    @njit(parallel=True, cache=True)
+    def correlation_spike_mask(corr, pval, win):
+        """Máscara de picos de correlación: |r|>0.6, p<0.01, ventana>=7"""
+        n = corr.shape[0]
+        out = np.empty(n, np.bool_)
+        for i in prange(n):
+            out[i] = (abs(corr[i]) > 0.6) & (pval[i] < 0.01) & (win[i] >= 7)
+        return out
+
+    @njit(parallel=True, cache=True)
+    def mental_health_spike_mask(increase, current, baseline):
+        """Máscara de repuntes de salud mental: +25% sobre línea base positiva"""
+        n = increase.shape[0]
+        out = np.empty(n, np.bool_)
+        for i in prange(n):
+            out[i] = ((increase[i] >= 25)
+                      & (current[i] > baseline[i])
+                      & (baseline[i] > 0))
+        return out
+
+    @njit(parallel=True, cache=True)
+    def high_risk_mask(risk, confidence):
+        """Máscara de predicciones de alto riesgo: score>=0.7 con confianza>=0.8"""
+        n = risk.shape[0]
+        out = np.empty(n, np.bool_)
+        for i in prange(n):
+            out[i] = (risk[i] >= 0.7) & (confidence[i] >= 0.8)
+        return out
+
+else:
+
+    def correlation_spike_mask(corr, pval, win):
+        """Máscara de picos de correlación: |r|>0.6, p<0.01, ventana>=7"""
+        return np.logical_and.reduce(
+            (np.abs(corr) > 0.6, pval < 0.01, win >= 7)
+        )
+
+    def mental_health_spike_mask(increase, current, baseline):
+        """Máscara de repuntes de salud mental: +25% sobre línea base positiva"""
+        return np.logical_and.reduce(
+            (increase >= 25, current > baseline, baseline > 0)
+        )
+
+    def high_risk_mask(risk, confidence):
+        """Máscara de predicciones de alto riesgo: score>=0.7 con confianza>=0.8"""
+        return (risk >= 0.7) & (confidence >= 0.8)
@@ -1,11 +1,66 @@
 """
 Reglas específicas para alertas de alta actividad solar (Kp)
 """
-from ..alert_engine import AlertRule, AlertType, AlertSeverity
-from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 
-def create_high_kp_rules():
-    """Crear reglas para alta actividad solar Kp"""
+import numpy as np
+import pandas as pd
+
+from ..alert_engine import AlertRule, AlertType, AlertSeverity, _col
+
+# Tabla de despacho por umbral Kp, de más a menos severa: una tormenta
+# extrema subsume a las menores, así que basta con la primera que aplica
+KP_BUCKETS = (
+    (8.0, 'kp_extreme_storm'),
+    (7.0, 'kp_severe_storm'),
+    (6.0, 'kp_moderate_storm_bz_south'),
+    (5.0, 'kp_minor_storm'),
+)
+
+def select_kp_rule(data: Dict[str, Any],
+                   rules_by_name: Dict[str, AlertRule]) -> Optional[AlertRule]:
+    """Seleccionar la regla Kp más severa que aplica a la muestra
+
+    Extrae los campos una sola vez y corta en el primer umbral alcanzado:
+    con kp < 5 no se evalúa ningún predicado, y con kp >= 8 solo dispara la
+    regla extrema en lugar de las cuatro.
+    """
+    kp = data.get('kp_index', 0)
+    if kp < KP_BUCKETS[-1][0]:
+        return None
+    for threshold, name in KP_BUCKETS:
+        if kp >= threshold:
+            rule = rules_by_name.get(name)
+            if rule is not None and rule.condition(data):
+                return rule
+    return None
+
+def evaluate_rules_batch(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Evaluar todas las reglas Kp/solares sobre un lote como máscaras NumPy
+
+    Para replay histórico o backfill: una operación de máscara por regla
+    sustituye miles de invocaciones de closure. Los índices de las muestras
+    que disparan salen con np.flatnonzero(mask). La ingesta en vivo sigue
+    usando los closures escalares.
+    """
+    kp = _col(df, 'kp_index')
+    bz = _col(df, 'bz')
+    wind = _col(df, 'solar_wind_speed')
+
+    return {
+        'kp_extreme_storm': kp >= 8.0,
+        'kp_severe_storm': (kp >= 7.0) & (wind > 600),
+        'kp_moderate_storm_bz_south': (kp >= 6.0) & (bz < 0),
+        'kp_minor_storm': kp >= 5.0,
+        'rapid_kp_increase':
+            (_col(df, 'kp_current') - _col(df, 'kp_3h_ago')) >= 2.0,
+        'high_proton_density': _col(df, 'proton_density') >= 10.0,
+        'fast_solar_wind': wind >= 700,
+        'strong_negative_bz': bz <= -10,
+    }
+
+def create_high_kp_rules() -> List[AlertRule]:
+    """Crear reglas para alta actividad solar Kp (ordenadas por severidad)"""
     
     rules = []
     
@@ -94,9 +149,16 @@ def create_high_kp_rules():
         cooldown_minutes=90
     ))
     
+    # De más a menos severa: el motor evalúa en orden y, combinado con
+    # select_kp_rule, la primera coincidencia subsume a las inferiores
+    _order = ['kp_extreme_storm', 'kp_severe_storm',
+              'kp_moderate_storm_bz_south', 'kp_minor_storm',
+              'rapid_kp_increase']
+    rules.sort(key=lambda rule: _order.index(rule.name))
+
     return rules
 
-def create_solar_parameter_rules():
+def create_solar_parameter_rules() -> List[AlertRule]:
     """Reglas basadas en otros parámetros solares"""
     
     rules = []